@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Материализованные агрегаты для analyze.py — графики читают их, а не articles.
+
+▪ agg_day    — день × политик × тональность
+▪ agg_source — месяц × источник × политик × тональность
+▪ agg_hour   — месяц × день недели × час × политик
+▪ новые строки добавляются по «отметке» max(id) (agg_state.hwm)
+▪ смена тональности уже учтённых строк — вычесть старое, прибавить новое
+▪ n — все статьи, u — уникальные истории (cluster_id = id, см. dedup.py)
+
+Все функции работают внутри транзакции вызывающего кода.
+"""
+
+import sqlite3
+
+# articles + словари; выражения и условия ссылаются на a / s / e
+FROM = """articles a
+          LEFT JOIN sources  s ON s.id = a.source_id
+          LEFT JOIN entities e ON e.id = a.entity_id"""
+
+TABLES = {
+    "agg_day": dict(
+        cols="day TEXT, politician TEXT, sentiment TEXT",
+        key="day, politician, sentiment",
+        expr="date(a.published_ts, 'unixepoch'), e.name, coalesce(a.sentiment, '')",
+    ),
+    "agg_source": dict(
+        cols="month TEXT, source TEXT, politician TEXT, sentiment TEXT",
+        key="month, source, politician, sentiment",
+        expr="strftime('%Y-%m', a.published_ts, 'unixepoch'), s.name, e.name, "
+             "coalesce(a.sentiment, '')",
+    ),
+    "agg_hour": dict(
+        cols="month TEXT, weekday INTEGER, hour INTEGER, politician TEXT",
+        key="month, weekday, hour, politician",
+        expr="""strftime('%Y-%m', a.published_ts, 'unixepoch'),
+                CAST(strftime('%w', a.published_ts, 'unixepoch') AS INTEGER),
+                CAST(strftime('%H', a.published_ts, 'unixepoch') AS INTEGER),
+                e.name""",
+    ),
+}
+WITH_SENTIMENT = ["agg_day", "agg_source"]
+
+def create(c: sqlite3.Connection) -> None:
+    for name, t in TABLES.items():
+        cols = {r[1] for r in c.execute(f"PRAGMA table_info({name})")}
+        if cols and "u" not in cols:                 # старая версия — пересобрать
+            c.execute(f"DROP TABLE {name}")
+            c.execute("DROP TABLE IF EXISTS agg_state")
+        c.execute(f"""CREATE TABLE IF NOT EXISTS {name} (
+                          {t['cols']}, n INTEGER NOT NULL, u INTEGER NOT NULL,
+                          PRIMARY KEY ({t['key']})
+                      ) WITHOUT ROWID""")
+    c.execute("CREATE TABLE IF NOT EXISTS agg_state (name TEXT PRIMARY KEY, value INTEGER)")
+
+def hwm(c: sqlite3.Connection) -> int:
+    r = c.execute("SELECT value FROM agg_state WHERE name='hwm'").fetchone()
+    return r[0] if r else 0
+
+def _pos(t: dict) -> str:
+    return ", ".join(str(i + 1) for i in range(t["key"].count(",") + 1))
+
+def _bump(c, where: str, args: tuple, sign: int, tables=TABLES) -> None:
+    """Прибавить sign × количество строк articles, подходящих под where, ко всем агрегатам."""
+    for name in tables:
+        t = TABLES[name]
+        c.execute(
+            f"""INSERT INTO {name} ({t['key']}, n, u)
+                SELECT {t['expr']}, ? * count(*), ? * sum(coalesce(a.cluster_id, a.id) = a.id)
+                FROM {FROM}
+                WHERE {where} GROUP BY {_pos(t)}
+                ON CONFLICT ({t['key']}) DO UPDATE SET n = n + excluded.n, u = u + excluded.u""",
+            (sign, sign, *args),
+        )
+
+# ─── новые строки ──────────────────────────────────────────
+def refresh(c: sqlite3.Connection) -> int:
+    """Учесть строки с id выше отметки. Возвращает число учтённых строк."""
+    lo = hwm(c)
+    hi = c.execute("SELECT max(id) FROM articles").fetchone()[0] or 0
+    if hi <= lo: return 0
+    _bump(c, "a.id > ? AND a.id <= ?", (lo, hi), +1)
+    c.execute("INSERT OR REPLACE INTO agg_state VALUES ('hwm', ?)", (hi,))
+    return c.execute("SELECT count(*) FROM articles WHERE id > ? AND id <= ?", (lo, hi)).fetchone()[0]
+
+# ─── смена тональности ─────────────────────────────────────
+def _mark(c, ids: list[int]) -> None:
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS agg_ids (id INTEGER PRIMARY KEY)")
+    c.execute("DELETE FROM temp.agg_ids")
+    c.executemany("INSERT OR IGNORE INTO temp.agg_ids VALUES (?)", ((i,) for i in ids))
+
+def retract(c: sqlite3.Connection, ids: list[int]) -> None:
+    """Вызывать ДО UPDATE sentiment: убрать старые метки этих строк."""
+    _mark(c, ids)
+    _bump(c, "a.id IN (SELECT id FROM temp.agg_ids) AND a.id <= ?", (hwm(c),), -1, WITH_SENTIMENT)
+
+def reapply(c: sqlite3.Connection) -> None:
+    """Вызывать ПОСЛЕ UPDATE sentiment: учесть новые метки тех же строк."""
+    _bump(c, "a.id IN (SELECT id FROM temp.agg_ids) AND a.id <= ?", (hwm(c),), +1, WITH_SENTIMENT)
+    for name in WITH_SENTIMENT:
+        c.execute(f"DELETE FROM {name} WHERE n = 0")
+
+def rebuild(c: sqlite3.Connection) -> None:
+    """Пересчитать всё с нуля (например, после --relabel)."""
+    for name in TABLES:
+        c.execute(f"DELETE FROM {name}")
+    c.execute("DELETE FROM agg_state WHERE name='hwm'")
+    refresh(c)
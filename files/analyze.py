@@ -1,74 +1,132 @@
 # -*- coding: utf-8 -*-
 """
-Читает news.db, формирует news.csv и 12 PNG-графиков.
+Читает news.db, рисует 13 PNG-графиков (graphs/) и запускает выгрузку (export.py).
 Все файлы кладутся в ту же папку, где лежит news.db.
 
-▪ путь к базе задаётся env-переменной DB_PATH  
+▪ путь к базе задаётся env-переменной DB_PATH
 ▪ если DB_PATH нет — берётся news.db рядом со скриптом
+▪ графики строятся по агрегатам (aggregates.py), а не по всей таблице news
+▪ выгрузка — export.py: Parquet по месяцам (только изменённые партиции),
+  news.csv — только при EXPORT_CSV=1
+▪ UNIQUE_STORIES=1 — считать истории, а не статьи (перепечатки — один раз)
+▪ каждая сводная таблица считается один раз (prepare), графики рисуются
+  параллельно в процессах (ANALYZE_WORKERS) на бэкенде Agg
 """
 
 import os
 import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
+from types import MappingProxyType
 
+import matplotlib
+matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import pandas as pd
 
+import aggregates, database, export, metrics
+
 # ─── 1. пути и диапазон дат ────────────────────────────────────────────
 DB   = Path(os.getenv("DB_PATH", Path(__file__).parent / "news.db"))
-ROOT = DB.parent                         # здесь будут csv и графы
-CSV  = ROOT / "news.csv"
+ROOT = DB.parent                         # здесь будут графики и выгрузка
 GR   = ROOT / "graphs"
-GR.mkdir(exist_ok=True)
+WORKERS = int(os.getenv("ANALYZE_WORKERS", min(os.cpu_count() or 1, 4)))
+N = "u" if os.getenv("UNIQUE_STORIES") == "1" else "n"   # u — без перепечаток
 
 POL   = ["Trump", "Putin", "Xi"]
 START = pd.Timestamp("2024-09-01")
 END   = pd.Timestamp(datetime.utcnow())      # «сегодня» UTC
+DAYS  = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+
+# ─── 2. загрузка агрегатов ─────────────────────────────────────────────
+def load(c: sqlite3.Connection) -> dict[str, pd.DataFrame]:
+    """Агрегаты за START…END: day / src / hrs."""
+    lo, hi = START.strftime("%Y-%m-%d"), END.strftime("%Y-%m-%d")
+    aggregates.refresh(c)                       # если что-то вставили мимо save()
+    day = pd.read_sql(f"SELECT day, politician, sentiment, {N} AS n FROM agg_day "
+                      "WHERE day >= ? AND day <= ?", c, params=(lo, hi))
+    src = pd.read_sql(f"SELECT source, politician, sentiment, {N} AS n FROM agg_source "
+                      "WHERE month >= ? AND month <= ?", c, params=(lo[:7], hi[:7]))
+    hrs = pd.read_sql(f"SELECT weekday, hour, politician, {N} AS n FROM agg_hour "
+                      "WHERE month >= ? AND month <= ?", c, params=(lo[:7], hi[:7]))
+    day["day"] = pd.to_datetime(day["day"])
+    return dict(day=day, src=src, hrs=hrs)
 
-# ─── 2. загрузка базы ───────────────────────────────────────────────────
-if not DB.exists():
-    raise FileNotFoundError(f"news.db не найден по пути {DB}")
+# ─── 3. общие сводные таблицы (считаются один раз) ─────────────────────
+def per_day(frame: pd.DataFrame, by: str) -> pd.DataFrame:
+    """Таблица день × by (politician / sentiment) с количеством статей."""
+    return frame.groupby([frame["day"].dt.date, by])["n"].sum().unstack(fill_value=0)
 
-with sqlite3.connect(DB) as c:
-    df = pd.read_sql("SELECT * FROM news", c)
+def last_days(day: pd.DataFrame, n: int, end: pd.Timestamp = END) -> pd.DataFrame:
+    """Таблица политик × 'мм-дд' за последние n дней до end."""
+    r = day[day["day"] >= (end - timedelta(days=n)).normalize()]
+    return r.groupby(["politician", r["day"].dt.strftime("%m-%d")])["n"].sum() \
+            .unstack(fill_value=0).reindex(index=POL)
 
-# привели published_at к tz-naive datetime
-df["published_at"] = pd.to_datetime(df["published_at"], utc=True).dt.tz_localize(None)
-df = df[(df["published_at"] >= START) & (df["published_at"] <= END)].copy()
-df.to_csv(CSV, index=False)
+def prepare(f: dict[str, pd.DataFrame],
+            end: pd.Timestamp = END) -> tuple[MappingProxyType, dict[str, float]]:
+    """
+    Все сводные таблицы, нужные графикам, — каждая ровно один раз.
+    Возвращает неизменяемый словарь имя → DataFrame и время расчёта каждой.
+    Графики таблицы не меняют, только читают. end — конец «последних 30 дней».
+    """
+    day, src, hrs = f["day"], f["src"], f["hrs"]
+    pn = lambda g: g[g["sentiment"].isin(["positive", "negative"])]
+    steps = {
+        "daily":       lambda: per_day(day, "politician"),
+        "daily_sent":  lambda: per_day(pn(day), "sentiment"),
+        "pie":         lambda: day[day["sentiment"] != ""]
+                               .groupby(["politician", "sentiment"])["n"].sum(),
+        "monthly":     lambda: day.groupby([day["day"].dt.to_period("M"), "politician"])["n"]
+                               .sum().unstack(fill_value=0).reindex(columns=POL),
+        "source_pol":  lambda: src.groupby(["source", "politician"])["n"].sum()
+                               .unstack(fill_value=0),
+        "source_sent": lambda: pn(src).groupby(["source", "sentiment"])["n"].sum()
+                               .unstack(fill_value=0),
+        "recent":      lambda: last_days(day, 30, end),
+        "weekday":     lambda: hrs.groupby([hrs["weekday"].map(dict(enumerate(DAYS))), "politician"])
+                               ["n"].sum().unstack(fill_value=0).reindex(DAYS[1:] + DAYS[:1]),
+        "hourly":      lambda: hrs.groupby(["hour", "politician"])["n"].sum()
+                               .unstack(fill_value=0).reindex(columns=POL).sort_index(),
+    }
+    cache, took = {}, {}
+    for name, fn in steps.items():
+        t = time.perf_counter()
+        cache[name] = fn()
+        took[name] = time.perf_counter() - t
+    return MappingProxyType(cache), took
 
-if df.empty:
-    print("⚠️  В базе нет данных в указанном диапазоне."); exit()
+# ─── 4. функции построения графиков ─────────────────────────────────────
+# таблицы могут быть отфильтрованы (server.py): рисуются только те политики,
+# что в них есть, отсутствующие колонки не ломают график
+def present(g: pd.DataFrame) -> list[str]:
+    return [p for p in POL if p in g.columns]
 
-# ─── 3. функции построения графиков ─────────────────────────────────────
-def timeline_mentions():
+def timeline_mentions(daily):
     """Сглаженная (3-дня) линия количества упоминаний по каждому политику"""
-    g = df.groupby([df["published_at"].dt.date, "politician"]).size() \
-          .unstack(fill_value=0).rolling(3).mean()
+    g = daily.rolling(3).mean()
     plt.figure(figsize=(12, 4))
-    for p in POL:
+    for p in present(g):
         plt.plot(g.index, g[p], lw=2, label=p)
     plt.title("Упоминания • скользящее 3 дня")
     plt.grid(); plt.legend(); plt.tight_layout()
     plt.savefig(GR / "mentions_timeline.png"); plt.close()
 
-def stacked_mentions():
+def stacked_mentions(daily):
     """Stacked-area та же метрика"""
-    g = df.groupby([df["published_at"].dt.date, "politician"]).size() \
-          .unstack(fill_value=0).reindex(columns=POL).rolling(3).mean()
+    g = daily[present(daily)].rolling(3).mean()
     plt.figure(figsize=(12, 5))
-    plt.stackplot(g.index, g.T, labels=POL)
+    plt.stackplot(g.index, g.T, labels=g.columns)
     plt.title("Stacked-area упоминаний (3 дн. сглаживание)")
     plt.xlabel("Дата"); plt.ylabel("Статей")
     plt.legend(loc="upper left"); plt.tight_layout()
     plt.savefig(GR / "stacked_mentions.png"); plt.close()
 
-def sentiment_timeline():
+def sentiment_timeline(daily_sent):
     """Positive vs Negative в разрезе всей базы"""
-    sub = df[df["sentiment"].isin(["positive", "negative"])]
-    g = sub.groupby([sub["published_at"].dt.date, "sentiment"]).size() \
-           .unstack(fill_value=0)[["positive", "negative"]].rolling(3).mean()
+    g = daily_sent.reindex(columns=["positive", "negative"], fill_value=0).rolling(3).mean()
     plt.figure(figsize=(12, 4))
     plt.plot(g.index, g["positive"], label="positive", color="green")
     plt.plot(g.index, g["negative"], label="negative", color="red")
@@ -76,10 +134,11 @@ def sentiment_timeline():
     plt.grid(); plt.legend(); plt.tight_layout()
     plt.savefig(GR / "sentiment_timeline.png"); plt.close()
 
-def pie_sentiments():
+def pie_sentiments(pie):
     """Круговые диаграммы по каждому политику"""
     for p in POL:
-        counts = df[df["politician"] == p]["sentiment"].value_counts()
+        counts = pie.get(p, pd.Series(dtype=int)).sort_values(ascending=False)
+        counts = counts[counts > 0]
         if counts.empty: continue
         plt.figure(figsize=(4, 4))
         plt.pie(counts, labels=counts.index, autopct="%1.1f%%", startangle=140)
@@ -87,10 +146,9 @@ def pie_sentiments():
         plt.tight_layout()
         plt.savefig(GR / f"pie_sentiment_{p}.png"); plt.close()
 
-def monthly_mentions():
+def monthly_mentions(monthly):
     """Статьи по месяцам (stacked bar)"""
-    g = df.groupby([df["published_at"].dt.to_period("M"), "politician"]).size() \
-          .unstack(fill_value=0).reindex(columns=POL)
+    g = monthly.copy()
     g.index = g.index.astype(str)
     g.plot(kind="bar", stacked=True, figsize=(12, 6))
     plt.title("Статьи по месяцам")
@@ -98,80 +156,117 @@ def monthly_mentions():
     plt.xticks(rotation=45, ha="right"); plt.tight_layout()
     plt.savefig(GR / "monthly_mentions.png"); plt.close()
 
-def cumulative_mentions():
+def cumulative_mentions(daily):
     """Накопительный счётчик упоминаний"""
-    g = df.groupby([df["published_at"].dt.date, "politician"]).size() \
-          .unstack(fill_value=0).reindex(columns=POL).cumsum()
+    g = daily[present(daily)].cumsum()
     plt.figure(figsize=(12, 5))
-    for p in POL: plt.plot(g.index, g[p], lw=2, label=p)
+    for p in g.columns: plt.plot(g.index, g[p], lw=2, label=p)
     plt.title("Накопленные упоминания"); plt.grid(); plt.legend()
     plt.tight_layout(); plt.savefig(GR / "cumulative_mentions.png"); plt.close()
 
-def source_top20():
+def source_top20(source_pol):
     """ТОП-20 медиа-источников (stacked bar)"""
-    g = df.groupby(["source", "politician"]).size().unstack(fill_value=0)
-    g["total"] = g.sum(1)
+    g = source_pol.assign(total=source_pol.sum(1))
     g = g.sort_values("total", ascending=False).head(20).drop(columns="total")
     g.plot(kind="barh", stacked=True, figsize=(10, 8))
     plt.title("ТОП-20 источников"); plt.xlabel("Статей")
     plt.legend(title="Политик"); plt.tight_layout()
     plt.savefig(GR / "source_top20.png"); plt.close()
 
-def source_sentiment_bar():
+def source_sentiment_bar(source_sent):
     """Positive vs Negative для ТОП-15 источников"""
-    g = df[df["sentiment"].isin(["positive", "negative"])]
-    g = g.groupby(["source", "sentiment"]).size().unstack(fill_value=0)
-    g["total"] = g.sum(1)
+    g = source_sent.assign(total=source_sent.sum(1))
     g = g.sort_values("total", ascending=False).head(15).drop(columns="total")
     g.plot(kind="bar", figsize=(12, 6))
     plt.title("Позитив / негатив • ТОП-15 источников")
     plt.xticks(rotation=45, ha="right"); plt.tight_layout()
     plt.savefig(GR / "source_sentiment_bar.png"); plt.close()
 
-def heatmap_month():
+def heatmap_month(recent):
     """Heatmap последних 30 дней"""
-    cutoff = END - timedelta(days=30)
-    recent = df[df["published_at"] >= cutoff].copy()
-    recent["day"] = recent["published_at"].dt.strftime("%m-%d")
-    pivot = recent.groupby(["politician", "day"]).size().unstack(fill_value=0) \
-                  .reindex(index=POL)
     plt.figure(figsize=(14, 3))
-    plt.imshow(pivot, aspect="auto", cmap="viridis")
-    plt.yticks(range(len(POL)), POL)
-    plt.xticks(range(len(pivot.columns)), pivot.columns, rotation=90, fontsize=6)
+    plt.imshow(recent, aspect="auto", cmap="viridis")
+    plt.yticks(range(len(recent.index)), recent.index)
+    plt.xticks(range(len(recent.columns)), recent.columns, rotation=90, fontsize=6)
     plt.colorbar(label="Статей")
     plt.title("Тепловая карта: последние 30 дней")
     plt.tight_layout(); plt.savefig(GR / "heatmap_month.png"); plt.close()
 
-def weekday_pattern():
+def weekday_pattern(weekday):
     """Распределение публикаций по дням недели"""
-    df["weekday"] = df["published_at"].dt.day_name()
-    order = ["Monday","Tuesday","Wednesday","Thursday","Friday","Saturday","Sunday"]
-    g = df.groupby(["weekday", "politician"]).size().unstack(fill_value=0).reindex(order)
-    g.plot(kind="bar", stacked=True, figsize=(10, 5))
+    weekday.plot(kind="bar", stacked=True, figsize=(10, 5))
     plt.title("По дням недели"); plt.xlabel("День"); plt.ylabel("Статей")
     plt.tight_layout(); plt.savefig(GR / "weekday_pattern.png"); plt.close()
 
-def hourly_pattern():
+def hourly_pattern(hourly):
     """Распределение публикаций по часам (UTC)"""
-    df["hour"] = df["published_at"].dt.hour
-    g = df.groupby(["hour", "politician"]).size().unstack(fill_value=0) \
-          .reindex(columns=POL).sort_index()
-    g.plot(kind="bar", stacked=True, figsize=(10, 5))
+    hourly.plot(kind="bar", stacked=True, figsize=(10, 5))
     plt.title("По часам суток (UTC)"); plt.xlabel("Час"); plt.ylabel("Статей")
     plt.tight_layout(); plt.savefig(GR / "hourly_pattern.png"); plt.close()
 
-# ─── 4. генерируем все графики ──────────────────────────────────────────
-timeline_mentions()
-stacked_mentions()
-sentiment_timeline()
-pie_sentiments()
-monthly_mentions()
-cumulative_mentions()
-source_top20()
-source_sentiment_bar()
-heatmap_month()
-weekday_pattern()
-hourly_pattern()
-
-print("✓ news.csv и 12 графиков сохранены в", ROOT)
+CHARTS = [
+    timeline_mentions, stacked_mentions, sentiment_timeline, pie_sentiments,
+    monthly_mentions, cumulative_mentions, source_top20, source_sentiment_bar,
+    heatmap_month, weekday_pattern, hourly_pattern,
+]
+
+# ─── 5. параллельная отрисовка ──────────────────────────────────────────
+_CACHE: MappingProxyType | None = None
+
+def _init(cache) -> None:
+    """Инициализатор воркера: кэш передаётся один раз на процесс, а не на график."""
+    global _CACHE
+    _CACHE = MappingProxyType(dict(cache))
+
+def render(name: str) -> tuple[str, float]:
+    """Рисует один график по имени функции, аргументы берёт из кэша по именам параметров."""
+    fn = globals()[name]
+    args = [_CACHE[a] for a in fn.__code__.co_varnames[:fn.__code__.co_argcount]]
+    t = time.perf_counter()
+    fn(*args)
+    return name, time.perf_counter() - t
+
+def main():
+    if not DB.exists():
+        raise FileNotFoundError(f"news.db не найден по пути {DB}")
+    GR.mkdir(exist_ok=True)
+    database.create()                           # миграции схемы, таблицы агрегатов
+
+    t = time.perf_counter()
+    with sqlite3.connect(DB) as c:
+        frames = load(c)
+        n, total = export.run(c)
+    t_load = time.perf_counter() - t
+
+    if frames["day"].empty:
+        print("⚠️  В базе нет данных в указанном диапазоне."); return
+
+    cache, compute = prepare(frames)
+    names = [f.__name__ for f in CHARTS]
+    t = time.perf_counter()
+    if WORKERS > 1:
+        with ProcessPoolExecutor(WORKERS, initializer=_init, initargs=(dict(cache),)) as pool:
+            took = dict(pool.map(render, names))
+    else:
+        _init(cache)
+        took = dict(map(render, names))
+    t_render = time.perf_counter() - t
+
+    metrics.observe("news_stage_seconds", t_load, stage="analyze_load")
+    metrics.observe("news_stage_seconds", t_render, stage="analyze_render")
+    for k, v in compute.items(): metrics.observe("news_analyze_seconds", v, step=f"prepare.{k}")
+    for k, v in took.items():    metrics.observe("news_analyze_seconds", v, step=f"chart.{k}")
+    metrics.gauge("news_export_partitions", n, state="rewritten")
+    metrics.gauge("news_export_partitions", total, state="total")
+    metrics.write("analyze")
+
+    print(f"⏱ загрузка и выгрузка {t_load * 1e3:.0f} ms (parquet: {n}/{total} партиций)")
+    for k, v in compute.items():
+        print(f"   расчёт  {k:<22}{v * 1e3:8.1f} ms")
+    for k, v in took.items():
+        print(f"   график  {k:<22}{v * 1e3:8.1f} ms")
+    print(f"⏱ отрисовка всего {t_render * 1e3:.0f} ms ({WORKERS} процесс.)")
+    print("✓ графики сохранены в", GR)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+"""
+Бенчмарки горячих мест пайплайна. Запуск из папки files:
+
+    python -m bench.suite                # все этапы → bench-<commit>.json
+    python -m bench.compare a.json b.json
+    python -m bench.corpus --rows 1000000 --out corpus.jsonl.gz
+    python -m bench.save
+    python -m bench.fetch
+    python -m bench.dates
+"""
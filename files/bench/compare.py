@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+"""
+Сравнение двух прогонов bench.suite: что ускорилось, что замедлилось.
+
+    python -m bench.compare bench-old.json bench-new.json [--threshold 0.10]
+
+Сравнивается время на одну строку (seconds / n), поэтому прогоны
+с разным --rows тоже сопоставимы. Код выхода 1 — есть регрессия
+больше порога (удобно для CI).
+"""
+
+import argparse, json, sys
+
+def load(path: str) -> dict:
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("old")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=0.10, help="допустимое замедление (доля)")
+    a = ap.parse_args()
+    old, new = load(a.old), load(a.new)
+    print(f"{old['meta'].get('commit')} → {new['meta'].get('commit')}")
+    bad = []
+    for name in sorted(old["results"].keys() | new["results"].keys()):
+        o, n = old["results"].get(name, {}), new["results"].get(name, {})
+        if "seconds" not in o or "seconds" not in n:
+            print(f"  {name:<32} {'есть' if 'seconds' in o else '—':>13} → "
+                  f"{'есть' if 'seconds' in n else '—':>13}")
+            continue
+        ratio = (n["seconds"] / n["n"]) / (o["seconds"] / o["n"])
+        flag = "  ▲ регрессия" if ratio > 1 + a.threshold else \
+               "  ▼" if ratio < 1 - a.threshold else ""
+        if flag.startswith("  ▲"): bad.append(name)
+        print(f"  {name:<32} {o['seconds'] * 1e3:>10.1f} ms → {n['seconds'] * 1e3:>10.1f} ms"
+              f"   ×{ratio:5.2f}{flag}")
+    if bad:
+        print(f"⚠️ регрессии (>{a.threshold:.0%}): {', '.join(bad)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Синтетический корпус для бенчмарков: статьи и RSS / Atom-документы.
+
+    python -m bench.corpus --rows 1000000 --out corpus.jsonl.gz [--dup 0.1 --langs en,ru,zh]
+
+▪ статьи в формате rss.parse() до очистки: content — HTML-фрагмент ленты
+  (теги, сущности, хвост «[+N chars]» — как в реальных лентах)
+▪ языки en / ru / zh, имена — алиасы из entities.REGISTRY нужного письма
+▪ доля персон задаётся mix (имя → вес, "Mixed" — двое сразу, "" — никого)
+▪ dup — доля повторов: половина — тот же url, половина — перепечатка
+  под новым url с чуть изменённым текстом (ловится dedup.py)
+▪ генератор: 10M статей не держатся в памяти, детерминирован по seed
+"""
+
+import argparse, gzip, json, random
+from collections import deque
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+
+import entities
+
+MIX = {"Trump": 0.35, "Putin": 0.25, "Xi": 0.2, "Mixed": 0.1, "": 0.1}
+LANGS = ("en", "ru", "zh")
+
+WORDS = {
+    "en": ("the president said on talks trade tariffs sanctions summit minister "
+           "government officials meeting agreement economy security war peace "
+           "border election market report week new policy leaders deal visit "
+           "statement foreign military support growth crisis global energy oil "
+           "country state national people public analysts expected plan after "
+           "before during against with from about over more than could would").split(),
+    "ru": ("президент заявил переговоры торговля пошлины санкции саммит министр "
+           "правительство встреча соглашение экономика безопасность война мир "
+           "граница выборы рынок доклад неделя новый политика лидеры сделка визит "
+           "заявление внешний военный поддержка рост кризис энергия нефть страна "
+           "государство народ аналитики ожидают план после перед во время против "
+           "с от о более чем может будет").split(),
+    "zh": list("主席表示会谈贸易关税制裁峰会部长政府官员会议协议经济安全战争和平边境选举市场报告"
+               "本周新政策领导人交易访问声明外交军事支持增长危机全球能源石油国家人民分析师预计计划"),
+}
+SEP = {"en": " ", "ru": " ", "zh": ""}
+
+def aliases(lang: str) -> dict[str, list[str]]:
+    """Имя → алиасы, написанные письмом этого языка."""
+    def script(a: str) -> str:
+        if entities._cjk(a): return "zh"
+        return "ru" if any("а" <= ch.lower() <= "я" for ch in a) else "en"
+    out = {n: [a for a in al if script(a) == lang] for n, al in entities.REGISTRY.items()}
+    return {n: al or entities.REGISTRY[n][:1] for n, al in out.items()}
+
+_ALIAS = {lang: aliases(lang) for lang in LANGS}
+
+def _text(rnd: random.Random, lang: str, names: list[str], n: int) -> str:
+    w = [rnd.choice(WORDS[lang]) for _ in range(n)]
+    for name in names:
+        w.insert(rnd.randrange(len(w) + 1), rnd.choice(_ALIAS[lang][name]))
+    return SEP[lang].join(w)
+
+def _html(rnd: random.Random, text: str) -> str:
+    """Оформление как в лентах: абзацы, сущности, иногда хвост NewsAPI."""
+    parts = [text[i:i + 300] for i in range(0, len(text), 300)]
+    s = "".join(f"<p>{escape(p)}</p>\n" for p in parts)
+    if rnd.random() < 0.3: s = s.replace(" ", "&nbsp;", 2)
+    if rnd.random() < 0.2: s = f"{s}… [+{rnd.randrange(200, 9000)} chars]"
+    return s
+
+def articles(n: int, seed: int = 0, mix: dict[str, float] | None = None, dup: float = 0.1,
+             langs: tuple[str, ...] = LANGS, sources: int = 200, days: int = 365,
+             end: datetime | None = None):
+    """Генератор n статей: dict(source, title, url, publishedAt, content)."""
+    rnd = random.Random(seed)
+    mix = mix or MIX
+    names, weights = list(mix), list(mix.values())
+    persons = list(entities.REGISTRY)
+    end = end or datetime.utcnow().replace(microsecond=0)
+    recent: deque[dict] = deque(maxlen=1000)             # кандидаты в повторы
+    for i in range(n):
+        if recent and rnd.random() < dup:
+            a = dict(rnd.choice(recent))
+            if rnd.random() < 0.5:                       # перепечатка: новый url, новый источник
+                a["url"] = f"https://syndicate{rnd.randrange(sources)}.example/{seed}/{i}"
+                a["source"] = f"Source {rnd.randrange(sources)}"
+                a["content"] = a["content"] + f"<p>{escape(a['source'])}</p>"
+            yield a
+            continue
+        lang = rnd.choice(langs)
+        pick = rnd.choices(names, weights)[0]
+        who = rnd.sample(persons, 2) if pick == "Mixed" else [pick] if pick else []
+        ts = end - timedelta(seconds=rnd.randrange(days * 86400))
+        a = dict(
+            source=f"Source {rnd.randrange(sources)}",
+            title=_text(rnd, lang, who[:1], rnd.randrange(6, 14)),
+            url=f"https://news{rnd.randrange(sources)}.example/{seed}/{i}",
+            publishedAt=ts.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            content=_html(rnd, _text(rnd, lang, who, rnd.randrange(40, 200))),
+        )
+        recent.append(a)
+        yield a
+
+# ─── документы лент ────────────────────────────────────────
+def rss(items: list[dict], title: str = "Synthetic") -> bytes:
+    body = "".join(
+        f"<item><title>{escape(a['title'])}</title><link>{escape(a['url'])}</link>"
+        f"<pubDate>{datetime.strptime(a['publishedAt'], '%Y-%m-%dT%H:%M:%SZ'):%a, %d %b %Y %H:%M:%S} GMT"
+        f"</pubDate><description>{escape(a['content'])}</description></item>"
+        for a in items
+    )
+    return (f'<?xml version="1.0" encoding="utf-8"?><rss version="2.0"><channel>'
+            f"<title>{escape(title)}</title>{body}</channel></rss>").encode()
+
+def atom(items: list[dict], title: str = "Synthetic") -> bytes:
+    body = "".join(
+        f"<entry><title>{escape(a['title'])}</title><link href=\"{escape(a['url'])}\"/>"
+        f"<id>{escape(a['url'])}</id><published>{a['publishedAt']}</published>"
+        f"<updated>{a['publishedAt']}</updated>"
+        f"<content type=\"html\">{escape(a['content'])}</content></entry>"
+        for a in items
+    )
+    return (f'<?xml version="1.0" encoding="utf-8"?><feed xmlns="http://www.w3.org/2005/Atom">'
+            f"<title>{escape(title)}</title>{body}</feed>").encode()
+
+def feeds(rows, per_feed: int = 50):
+    """Нарезка статей на ленты: (имя, байты), RSS и Atom через одну."""
+    buf, k = [], 0
+    for a in rows:
+        buf.append(a)
+        if len(buf) == per_feed:
+            yield f"Feed {k}", (rss if k % 2 == 0 else atom)(buf, f"Feed {k}")
+            buf, k = [], k + 1
+    if buf:
+        yield f"Feed {k}", (rss if k % 2 == 0 else atom)(buf, f"Feed {k}")
+
+def main():
+    ap = argparse.ArgumentParser(description="Синтетический корпус статей (JSONL)")
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--dup", type=float, default=0.1)
+    ap.add_argument("--langs", default=",".join(LANGS))
+    ap.add_argument("--mix", type=json.loads, default=None, help='JSON: {"Trump": 0.5, "": 0.5}')
+    ap.add_argument("--out", default="corpus.jsonl.gz")
+    a = ap.parse_args()
+    op = gzip.open if a.out.endswith(".gz") else open
+    with op(a.out, "wt", encoding="utf-8") as f:
+        for art in articles(a.rows, a.seed, a.mix, a.dup, tuple(a.langs.split(","))):
+            f.write(json.dumps(art, ensure_ascii=False) + "\n")
+    print(f"✓ {a.rows:,} статей → {a.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Даты: прежние database.fix_date() + to_ts() против dates.parse_many().
+
+    python -m bench.dates [--rows 200000] [--unique 0.05]
+
+▪ смесь форматов как в лентах: ISO с «Z», со смещением, с долями секунды,
+  RFC 822 (GMT / -0500 / MSK), немного мусора и пустых
+▪ скорость — на одинаковом списке (--unique — доля уникальных строк),
+  dates — «холодный» (кэш сброшен) и «тёплый»
+▪ точность — сколько дат прежняя функция сдвинула или заменила «сейчас»
+"""
+
+import argparse, calendar, random, time
+from datetime import datetime, timedelta, timezone
+
+import dates
+
+# ─── как было (database.py до dates.py) ────────────────────
+def fix_date(raw: str | None) -> str:
+    """ISO → 'YYYY-MM-DD HH:MM:SS' или текущий момент, если что-то пошло не так."""
+    if not raw:
+        return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+    raw = raw.rstrip("Z")
+    if "+" in raw: raw = raw.split("+")[0]
+    if "." in raw: raw = raw.split(".")[0]
+    try:
+        return datetime.strptime(raw, "%Y-%m-%dT%H:%M:%S") \
+                       .strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+
+def legacy(raws: list[str | None]) -> list[int]:
+    """fix_dates() + to_ts(): мемо на пакет, strptime на каждую уникальную строку."""
+    memo: dict[str | None, int] = {}
+    out = []
+    for r in raws:
+        t = memo.get(r)
+        if t is None:
+            d = fix_date(r)
+            t = memo[r] = calendar.timegm(datetime.strptime(d, "%Y-%m-%d %H:%M:%S").timetuple())
+        out.append(t)
+    return out
+
+# ─── выборка ───────────────────────────────────────────────
+FORMATS = {                                     # формат → доля
+    "iso_z":    0.45,                           # NewsAPI, rss.parse()
+    "iso_off":  0.25,                           # Mediastack: +00:00, но бывает -05:00
+    "iso_frac": 0.05,
+    "rfc_gmt":  0.1,
+    "rfc_off":  0.08,
+    "rfc_msk":  0.02,
+    "junk":     0.03,
+    "empty":    0.02,
+}
+
+def sample(rnd: random.Random, base: datetime) -> tuple[str | None, int | None]:
+    """(строка, правильное unix-время или None)."""
+    kind = rnd.choices(list(FORMATS), list(FORMATS.values()))[0]
+    dt = base - timedelta(seconds=rnd.randrange(365 * 86400))
+    h = rnd.choice((-5, -4, 0, 1, 3, 8))
+    tz = timezone(timedelta(hours=h))
+    loc = dt.astimezone(tz)
+    ts = int(dt.timestamp())
+    match kind:
+        case "iso_z":    return dt.strftime("%Y-%m-%dT%H:%M:%SZ"), ts
+        case "iso_off":  return loc.isoformat(), ts
+        case "iso_frac": return dt.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z", ts
+        case "rfc_gmt":  return dt.strftime("%a, %d %b %Y %H:%M:%S GMT"), ts
+        case "rfc_off":  return loc.strftime("%a, %d %b %Y %H:%M:%S %z"), ts
+        case "rfc_msk":
+            m = dt.astimezone(timezone(timedelta(hours=3)))
+            return m.strftime("%a, %d %b %Y %H:%M:%S MSK"), ts
+        case "junk":     return rnd.choice(("n/a", "yesterday", "0000-00-00 00:00:00")), None
+        case _:          return None, None
+
+def best(fn, repeat: int = 3) -> float:
+    out = []
+    for _ in range(repeat):
+        t = time.perf_counter(); fn(); out.append(time.perf_counter() - t)
+    return min(out)
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=200_000)
+    ap.add_argument("--unique", type=float, default=0.05, help="доля уникальных строк")
+    ap.add_argument("--seed", type=int, default=0)
+    a = ap.parse_args()
+    rnd = random.Random(a.seed)
+    base = datetime.now(timezone.utc).replace(microsecond=0)
+    pool = [sample(rnd, base) for _ in range(max(1, int(a.rows * a.unique)))]
+    pairs = [rnd.choice(pool) for _ in range(a.rows)]
+    raws = [r for r, _ in pairs]
+
+    old = best(lambda: legacy(raws))
+    def cold():
+        dates._parse.cache_clear()
+        dates.parse_many(raws)
+    new_cold = best(cold)
+    new_warm = best(lambda: dates.parse_many(raws))
+    for name, dt in (("fix_date + to_ts", old), ("dates (холодный)", new_cold),
+                     ("dates (тёплый)", new_warm)):
+        print(f"{name:<20}{a.rows / dt:>14,.0f} строк/с   ×{old / dt:5.1f}")
+
+    got_old, got_new = legacy(raws), dates.parse_many(raws)
+    known = [(o, n, t) for o, n, (_, t) in zip(got_old, got_new, pairs) if t is not None]
+    bad = sum(1 for _, t in pairs if t is None)
+    print(f"\nразборчивых {len(known)}, мусора/пустых {bad}")
+    print(f"  fix_date: верно {sum(o == t for o, _, t in known)}, "
+          f"сдвинуто или «сейчас» {sum(o != t for o, _, t in known)}, "
+          f"мусор → «сейчас» {bad}")
+    print(f"  dates:    верно {sum(n == t for _, n, t in known)}, "
+          f"ошибок {sum(n != t for _, n, t in known)}, "
+          f"отвергнуто {sum(n is None for n in got_new)}")
+
+if __name__ == "__main__":
+    main()
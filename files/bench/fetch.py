@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Загрузка лент: последовательный обход (как было в rss.main) против
+fetcher.fetch_all() — на локальных заглушках, без сети.
+
+    python -m bench.fetch [--feeds 50] [--hosts 5] [--delay 50,400] [--slow 2.0]
+
+▪ --hosts серверов на разных портах = разных хостов для RSS_PER_HOST
+▪ каждая лента отвечает с задержкой из --delay (мс), одна — через --slow сек
+  (медленный Reuters / Bloomberg)
+▪ --flaky — доля лент, которые первый раз отвечают 503 (проверка повторов)
+▪ оба варианта разбирают ленты feedparser'ом; число записей должно совпасть
+"""
+
+import argparse, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import feedparser
+
+import fetcher
+from bench import corpus
+
+class Stub(BaseHTTPRequestHandler):
+    body = b""
+    failed: set[str] = set()
+    lock = threading.Lock()
+
+    def do_GET(self):
+        q = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        time.sleep(float(q.get("delay", 0)))
+        if q.get("flaky") == "1":
+            with Stub.lock:
+                first = self.path not in Stub.failed
+                Stub.failed.add(self.path)
+            if first:
+                self.send_response(503); self.send_header("Content-Length", "0")
+                self.end_headers(); return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/rss+xml")
+        self.send_header("Content-Length", str(len(Stub.body)))
+        self.end_headers()
+        self.wfile.write(Stub.body)
+
+    def log_message(self, *a): pass
+
+def serve(n: int) -> list[ThreadingHTTPServer]:
+    out = []
+    for _ in range(n):
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+        srv.daemon_threads = True
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        out.append(srv)
+    return out
+
+def sequential(feeds: dict[str, str]) -> int:
+    """Исходный обход: feedparser.parse(url) по одной ленте."""
+    return sum(len(feedparser.parse(url).entries) for url in feeds.values())
+
+def concurrent(feeds: dict[str, str]) -> int:
+    n = 0
+    for _, r in fetcher.fetch_all(feeds):
+        if r["status"] == 200: n += len(feedparser.parse(r["body"]).entries)
+    return n
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--feeds", type=int, default=50)
+    ap.add_argument("--hosts", type=int, default=5)
+    ap.add_argument("--items", type=int, default=30, help="записей в ленте")
+    ap.add_argument("--delay", default="50,400", help="мин,макс задержка ответа, мс")
+    ap.add_argument("--slow", type=float, default=2.0, help="задержка самой медленной ленты, сек")
+    ap.add_argument("--flaky", type=float, default=0.0)
+    ap.add_argument("--seed", type=int, default=0)
+    a = ap.parse_args()
+    rnd = random.Random(a.seed)
+    lo, hi = (int(x) for x in a.delay.split(","))
+    Stub.body = corpus.rss(list(corpus.articles(a.items, a.seed, dup=0)))
+    servers = serve(a.hosts)
+
+    def feeds(run: str, flaky: bool) -> dict[str, str]:
+        out = {}
+        for i in range(a.feeds):
+            d = a.slow if i == 0 else rnd.uniform(lo, hi) / 1000
+            port = servers[i % a.hosts].server_port
+            f = "&flaky=1" if flaky and rnd.random() < a.flaky else ""
+            out[f"Feed {i}"] = f"http://127.0.0.1:{port}/{run}/{i}.xml?delay={d:.3f}{f}"
+        return out
+
+    t = time.perf_counter()
+    n_seq = sequential(feeds("seq", False))            # feedparser не повторяет 503
+    t_seq = time.perf_counter() - t
+    t = time.perf_counter()
+    n_con = concurrent(feeds("con", True))
+    t_con = time.perf_counter() - t
+
+    print(f"лент {a.feeds} на {a.hosts} хостах, задержка {lo}–{hi} ms, "
+          f"самая медленная {a.slow:.1f} s, RSS_WORKERS={fetcher.WORKERS}, "
+          f"RSS_PER_HOST={fetcher.PER_HOST}")
+    print(f"  последовательно  {t_seq:7.2f} s   записей {n_seq}")
+    print(f"  fetch_all        {t_con:7.2f} s   записей {n_con}   ×{t_seq / t_con:.1f}")
+    if n_seq != n_con: print("⚠️ число записей не совпало")
+    for s in servers: s.shutdown()
+
+if __name__ == "__main__":
+    main()
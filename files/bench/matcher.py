@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+categorize(): отдельный regex на каждую персону (как было) против
+одного общего выражения из entities.py. Корпус — db/news.csv.
+
+    python -m bench.matcher [--csv ../db/news.csv] [--extra 50]
+
+--extra добавляет столько вымышленных персон, чтобы видеть,
+как растёт цена с размером реестра.
+"""
+
+import argparse, csv, re, sys, time
+from pathlib import Path
+
+import entities
+
+def legacy(rows: list[dict], patterns: dict[str, re.Pattern]) -> int:
+    """Исходный цикл: lower() склейки + search() каждого шаблона."""
+    n = 0
+    for a in rows:
+        text = " ".join((a.get("title", ""), a.get("content", ""))).lower()
+        n += bool({p for p, pat in patterns.items() if pat.search(text)})
+    return n
+
+def single(rows: list[dict], pattern: re.Pattern, alias: dict[str, str]) -> int:
+    n = 0
+    for a in rows:
+        hit = {alias[entities._key(m.group())]
+               for t in (a.get("title", ""), a.get("content", ""))
+               for m in pattern.finditer(t or "")}
+        n += bool(hit)
+    return n
+
+def timed(fn, *args) -> tuple[float, int]:
+    t = time.perf_counter()
+    n = fn(*args)
+    return time.perf_counter() - t, n
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", default=str(Path(__file__).parents[2] / "db" / "news.csv"))
+    ap.add_argument("--extra", type=int, default=50)
+    a = ap.parse_args()
+
+    csv.field_size_limit(sys.maxsize)
+    with open(a.csv, encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+
+    for extra in sorted({0, a.extra}):
+        reg = dict(entities.REGISTRY) | {f"Person{i}": [f"Person{i} Surname{i}", f"Surname{i}"]
+                                         for i in range(extra)}
+        pats = {k: re.compile(r"\b(?:" + "|".join(map(re.escape, v)) + r")\b", re.I)
+                for k, v in reg.items()}
+        pattern, alias = entities.build(reg)
+        t_old, n_old = timed(legacy, rows, pats)
+        t_new, n_new = timed(single, rows, pattern, alias)
+        print(f"{len(reg):>3} персон, {len(rows)} статей: "
+              f"per-pattern {t_old * 1e3:7.1f} ms ({n_old} hits)   "
+              f"single-pass {t_new * 1e3:7.1f} ms ({n_new} hits)   ×{t_old / t_new:.1f}")
+
+if __name__ == "__main__":
+    main()
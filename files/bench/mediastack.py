@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Backfill Mediastack против локального фейкового API: пагинация, 429,
+квота и продолжение с сохранённого offset.
+
+    python -m bench.mediastack [--months 4] [--per-month 250] [--quota 10]
+
+Первый проход обрывается на квоте --quota, второй (с запасом) должен
+догрузить ровно то, чего не хватает, не повторяя уже скачанные страницы.
+Третий — «ничего нового»: по одной странице текущего месяца на персону.
+Код выхода 1, если статей не столько, сколько отдал API, если страница
+прошлого месяца скачана дважды или третий проход потратил больше запросов.
+"""
+
+import argparse, json, random, sqlite3, sys, tempfile, threading, time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import database
+
+class FakeAPI(BaseHTTPRequestHandler):
+    per_month = 250
+    calls: list[tuple[str, str, int]] = []
+
+    def do_GET(self):
+        q = {k: v[0] for k, v in parse_qs(urlsplit(self.path).query).items()}
+        kw, month, off = q["keywords"].strip('"'), q["date"][:7], int(q.get("offset", 0))
+        if random.random() < 0.1:                           # изредка — rate limit
+            return self.reply(429, {"error": {"code": "rate_limit_reached"}})
+        FakeAPI.calls.append((kw, month, off))
+        lim, total = int(q.get("limit", 25)), FakeAPI.per_month
+        today = date.today()                                # будущих статей API не отдаёт
+        days = today.day if month == f"{today:%Y-%m}" else 28
+        data = [dict(source="Fake Wire", title=f"{kw} story {month} #{i}",
+                     url=f"https://fake.example/{kw}/{month}/{i}",
+                     published_at=f"{month}-{1 + i % min(days, 28):02d}T{i % 24:02d}:00:00+00:00",
+                     description=f"{kw} said something number {i} " * 3)
+                for i in range(off, min(off + lim, total))]
+        self.reply(200, {"pagination": dict(limit=lim, offset=off, count=len(data), total=total),
+                         "data": data})
+
+    def reply(self, code: int, body: dict) -> None:
+        raw = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def log_message(self, *a): pass
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--months", type=int, default=4)
+    ap.add_argument("--per-month", type=int, default=250)
+    ap.add_argument("--quota", type=int, default=10, help="квота первого прохода")
+    a = ap.parse_args()
+    FakeAPI.per_month = a.per_month
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), FakeAPI)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+
+    with tempfile.TemporaryDirectory() as d:
+        database.DB = Path(d) / "news.db"
+        import mediastack_fetcher as ms
+        ms.KEY, ms.RPS = "fake", 50.0
+        ms.URL = f"http://127.0.0.1:{srv.server_port}/v1/news"
+        ms.TODAY = date.today()
+        y, m = divmod(ms.TODAY.year * 12 + ms.TODAY.month - a.months, 12)
+        ms.START = date(y, m + 1, 1)
+
+        t = time.perf_counter()
+        for quota in (a.quota, 10**6):
+            ms.QUOTA = quota
+            with sqlite3.connect(database.DB) as c:            # «новый месяц» — квота заново
+                c.execute("DROP TABLE IF EXISTS mediastack_usage")
+            ms.main()
+        dt = time.perf_counter() - t
+        before = len(FakeAPI.calls)
+        ms.main()                                               # ничего нового
+        idle = FakeAPI.calls[before:]
+
+        with sqlite3.connect(database.DB) as c:
+            n = c.execute("SELECT count(*) FROM articles").fetchone()[0]
+    srv.shutdown()
+    live = f"{ms.TODAY:%Y-%m}"
+    past = [p for p in FakeAPI.calls[:before] if p[1] != live]
+    repeats = len(past) - len(set(past))
+    want = a.months * len(ms.PEOPLE) * a.per_month
+    print(f"\nстатей {n} из {want}, страниц {before} (повторов вне {live}: {repeats}), "
+          f"{dt:.1f} s; без новых статей — запросов {len(idle)}")
+    bad = []
+    if n != want: bad.append(f"статей {n}, ожидалось {want}")
+    if repeats: bad.append(f"страниц прошлых месяцев скачано повторно: {repeats}")
+    if len(idle) != len(ms.PEOPLE) or any(p[1] != live or p[2] for p in idle):
+        bad.append(f"без новых статей ожидалось {len(ms.PEOPLE)} запросов "
+                   f"(offset 0, {live}), было: {idle}")
+    if bad: sys.exit("❌ " + "; ".join(bad))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+save(): построчный INSERT (как было) против пакетного executemany.
+
+    python -m bench.save [--rows 50000] [--dup 0.2]
+
+Оба варианта пишут в одну и ту же схему (articles + FTS-триггеры) одной
+транзакцией и делают одинаковую работу после вставки: dedup.assign()
+и aggregates.refresh(). Разница — только в самой вставке: execute +
+fix_date на строку против executemany + dates.parse_many. Доля dedup
+выводится отдельно.
+"""
+
+import argparse, calendar, random, tempfile, time
+from pathlib import Path
+
+import aggregates, database, dedup, normalize
+from bench import corpus as synthetic
+from bench.dates import fix_date
+
+def corpus(n: int, dup: float) -> list[dict]:
+    """n очищенных статей bench.corpus с политиком; dup — доля повторов и перепечаток."""
+    pols = ["Trump", "Putin", "Xi", "Mixed"]
+    rnd = random.Random(0)
+    return [a | dict(title=normalize.text(a["title"]), content=normalize.text(a["content"]),
+                     politician=rnd.choice(pols))
+            for a in synthetic.articles(n, 0, dup=dup)]
+
+# ─── время dedup внутри обоих вариантов ────────────────────
+_spent = {"dedup": 0.0}
+_assign = dedup.assign
+
+def _timed_assign(c, since_id: int) -> int:
+    t = time.perf_counter()
+    try:
+        return _assign(c, since_id)
+    finally:
+        _spent["dedup"] += time.perf_counter() - t
+
+dedup.assign = _timed_assign
+
+def legacy_save(rows: list[dict]) -> int:
+    """Исходная вставка: execute + fix_date на каждую строку; дальше — как в save()."""
+    c = database.connect()
+    try:
+        with c:
+            lo = c.execute("SELECT coalesce(max(id), 0) FROM articles").fetchone()[0]
+            cur, n = c.cursor(), 0
+            for a in rows:
+                src = database.ids(c, "sources", {a["source"]})
+                ent = database.ids(c, "entities", {a["politician"]})
+                ts = calendar.timegm(time.strptime(fix_date(a["publishedAt"]), "%Y-%m-%d %H:%M:%S"))
+                cur.execute(database.INSERT, (
+                    src.get(a["source"]), a["title"], a["url"], ts, a["content"],
+                    ent.get(a["politician"]), database.text_hash(a["title"], a["content"]),
+                    normalize.pack(a.get("raw"), a["content"])))
+                n += cur.rowcount
+            dedup.assign(c, lo)
+            aggregates.refresh(c)
+    finally:
+        c.close()
+    return n
+
+def run(name: str, fn, rows: list[dict]) -> None:
+    with tempfile.TemporaryDirectory() as d:
+        database.DB = Path(d) / "news.db"
+        database.create()
+        _spent["dedup"] = 0.0
+        t = time.perf_counter()
+        n = fn(rows)
+        dt = time.perf_counter() - t
+    print(f"{name:<8} {len(rows) / dt:>10,.0f} rows/s   вставлено {n}   "
+          f"dedup {_spent['dedup'] / dt:4.0%} ({len(rows) / _spent['dedup']:,.0f} rows/s)")
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--dup", type=float, default=0.2)
+    a = ap.parse_args()
+    rows = corpus(a.rows, a.dup)
+    run("legacy", legacy_save, rows)
+    run("bulk", lambda r: database.save(r)[0], rows)
+
+if __name__ == "__main__":
+    main()
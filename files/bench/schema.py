@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Схема v1 (news: TEXT-даты, строки, без индексов) против v2
+(articles: unix-время, словари, покрывающие индексы) на синтетической базе.
+
+    python -m bench.schema [--rows 5000000] [--dir /tmp]
+
+Для каждого «горячего» запроса печатает EXPLAIN QUERY PLAN и время.
+"""
+
+import argparse, random, sqlite3, tempfile, time
+from pathlib import Path
+
+import database
+
+SOURCES  = [f"Source {i}" for i in range(200)]
+POLS     = ["Trump", "Putin", "Xi", "Mixed"]
+T0, SPAN = 1_704_067_200, 2 * 365 * 86_400          # 2024-01-01 + два года
+
+V1 = """CREATE TABLE news (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source TEXT, title TEXT, url TEXT UNIQUE, published_at TEXT,
+            content TEXT, politician TEXT, sentiment TEXT,
+            compound REAL, pos REAL, neu REAL, neg REAL, text_hash TEXT, cluster_id INTEGER
+        )"""
+
+def synth(n: int, seed: int = 1):
+    """(id, источник, политик, unix-время, compound | None) — 1 % без оценки."""
+    rnd = random.Random(seed)
+    for i in range(1, n + 1):
+        cmp = None if rnd.random() < 0.01 else round(rnd.uniform(-1, 1), 4)
+        yield i, rnd.randrange(len(SOURCES)), rnd.randrange(len(POLS)), \
+              T0 + rnd.randrange(SPAN), cmp
+
+def label(cmp):
+    return None if cmp is None else \
+        "positive" if cmp > 0.2 else "negative" if cmp < -0.2 else "neutral"
+
+def build_v1(path: Path, n: int) -> None:
+    with sqlite3.connect(path) as c:
+        c.execute("PRAGMA journal_mode=OFF"); c.execute("PRAGMA synchronous=OFF")
+        c.execute(V1)
+        c.executemany(
+            """INSERT INTO news (id, source, title, url, published_at, content, politician,
+                                 sentiment, compound, cluster_id)
+               VALUES (?, ?, ?, ?, datetime(?, 'unixepoch'), '', ?, ?, ?, ?)""",
+            ((i, SOURCES[s], f"t{i}", f"u{i}", ts, POLS[p], label(cmp), cmp, i)
+             for i, s, p, ts, cmp in synth(n)),
+        )
+
+def build_v2(path: Path, n: int) -> None:
+    with sqlite3.connect(path) as c:
+        c.execute("PRAGMA journal_mode=OFF"); c.execute("PRAGMA synchronous=OFF")
+        for stmt in database.TABLES: c.execute(stmt)
+        c.execute(database.VIEW)
+        c.executemany("INSERT INTO sources VALUES (?, ?)", enumerate(SOURCES, 1))
+        c.executemany("INSERT INTO entities VALUES (?, ?)", enumerate(POLS, 1))
+        c.executemany(
+            """INSERT INTO articles (id, source_id, title, url, published_ts, content,
+                                     entity_id, sentiment, compound, cluster_id)
+               VALUES (?, ?, ?, ?, ?, '', ?, ?, ?, ?)""",
+            ((i, s + 1, f"t{i}", f"u{i}", ts, p + 1, label(cmp), cmp, i)
+             for i, s, p, ts, cmp in synth(n)),
+        )
+        c.execute("ANALYZE")
+
+# (название, запрос v1, запрос v2, параметры v1, параметры v2)
+QUERIES = [
+    ("диапазон дат",
+     "SELECT count(*) FROM news WHERE published_at >= ? AND published_at < ?",
+     "SELECT count(*) FROM articles WHERE published_ts >= ? AND published_ts < ?",
+     ("2025-03-01", "2025-04-01"), (1_740_787_200, 1_743_465_600)),
+    ("неоценённые",
+     "SELECT id FROM news WHERE compound IS NULL AND id > 0 ORDER BY id LIMIT 1000",
+     "SELECT id FROM articles WHERE compound IS NULL AND id > 0 ORDER BY id LIMIT 1000",
+     (), ()),
+    ("месяц × политик",
+     """SELECT substr(published_at, 1, 7), politician,
+               count(*), max(id), count(compound), total(compound)
+        FROM news GROUP BY 1, 2""",
+     """SELECT strftime('%Y-%m', a.published_ts, 'unixepoch'), e.name,
+               count(*), max(a.id), count(a.compound), total(a.compound)
+        FROM articles a LEFT JOIN entities e ON e.id = a.entity_id GROUP BY 1, 2""",
+     (), ()),
+    ("партиция",
+     """SELECT id, compound FROM news
+        WHERE published_at >= ? AND published_at < ? AND politician = ?""",
+     """SELECT id, compound FROM articles
+        WHERE entity_id = (SELECT id FROM entities WHERE name = ?)
+          AND published_ts >= ? AND published_ts < ?""",
+     ("2025-03", "2025-04", "Xi"), ("Xi", 1_740_787_200, 1_743_465_600)),
+    ("источник за месяц",
+     """SELECT source, count(*) FROM news
+        WHERE published_at >= ? AND published_at < ? GROUP BY 1""",
+     """SELECT s.name, count(*) FROM articles a JOIN sources s ON s.id = a.source_id
+        WHERE a.published_ts >= ? AND a.published_ts < ? GROUP BY 1""",
+     ("2025-03-01", "2025-04-01"), (1_740_787_200, 1_743_465_600)),
+]
+
+def measure(c: sqlite3.Connection, sql: str, args: tuple) -> tuple[list[str], float]:
+    plan = [r[-1] for r in c.execute("EXPLAIN QUERY PLAN " + sql, args)]
+    t = time.perf_counter()
+    c.execute(sql, args).fetchall()
+    return plan, time.perf_counter() - t
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, default=5_000_000)
+    ap.add_argument("--dir", default=None, help="куда положить временные базы")
+    a = ap.parse_args()
+    with tempfile.TemporaryDirectory(dir=a.dir) as d:
+        p1, p2 = Path(d) / "v1.db", Path(d) / "v2.db"
+        for name, fn, p in (("v1", build_v1, p1), ("v2", build_v2, p2)):
+            t = time.perf_counter()
+            fn(p, a.rows)
+            print(f"{name}: {a.rows:,} строк за {time.perf_counter() - t:.1f} s, "
+                  f"{p.stat().st_size / 2**20:,.0f} MB")
+        c1, c2 = sqlite3.connect(p1), sqlite3.connect(p2)
+        for title, q1, q2, a1, a2 in QUERIES:
+            (plan1, t1), (plan2, t2) = measure(c1, q1, a1), measure(c2, q2, a2)
+            print(f"\n── {title}: v1 {t1 * 1e3:,.1f} ms → v2 {t2 * 1e3:,.1f} ms")
+            for p in plan1: print(f"   v1  {p}")
+            for p in plan2: print(f"   v2  {p}")
+        c1.close(); c2.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Все этапы конвейера на синтетическом корпусе (bench/corpus.py) → JSON.
+
+    python -m bench.suite [--rows 10000] [--save-rows 5000] [--only normalize,save]
+                          [--out bench-<commit>.json]
+    python -m bench.compare bench-old.json bench-new.json
+
+▪ микро: dates (холодный кэш), normalize, categorize, parse (RSS + Atom),
+  save, sentiment (VADER), prepare и каждый график analyze.py
+▪ e2e: ленты → parse → classify → save → оценка → агрегаты → графики
+▪ время — лучшее из --repeat прогонов; save, sentiment, графики и e2e —
+  на --save-rows статей (вставка с dedup медленнее остальных этапов)
+"""
+
+import argparse, json, os, platform, sqlite3, subprocess, tempfile, time
+from datetime import datetime
+from pathlib import Path
+
+import aggregates, database, dates, normalize, rss
+from bench import corpus
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=Path(__file__).parent, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def best(fn, repeat: int) -> float:
+    out = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t)
+    return min(out)
+
+def clean(rows: list[dict]) -> list[dict]:
+    """Статьи в том виде, в каком их отдаёт rss.parse(): текст очищен, raw — исходник."""
+    return [a | dict(title=normalize.text(a["title"]), content=normalize.text(a["content"]),
+                     raw=a["content"]) for a in rows]
+
+def classified(rows: list[dict]) -> list[dict]:
+    out = []
+    for a in rows:
+        pol = database.politician(a)
+        if pol: out.append(a | dict(politician=pol))
+    return out
+
+# ─── этапы с базой ─────────────────────────────────────────
+def fresh_db(d: str, name: str) -> None:
+    database.DB = Path(d) / f"{name}.db"
+    database.create()
+
+def score_all(c: sqlite3.Connection) -> int:
+    """Оценка VADER в одном процессе (без пула), как делает воркер sentiment_analysis."""
+    import sentiment_analysis as sa
+    if sa._vader is None: sa._init()
+    n = 0
+    for rows in sa.chunks(c):
+        sc = sa.score([(i, t, x) for i, t, x, *_ in rows])
+        with c:
+            c.executemany("""UPDATE articles SET sentiment=?, compound=?, pos=?, neu=?, neg=?
+                             WHERE id=?""", [(sa.label(v[0]), *v, i) for i, v in sc.items()])
+        n += len(sc)
+    with c: aggregates.rebuild(c)
+    return n
+
+def charts(c: sqlite3.Connection, out: Path) -> dict[str, float]:
+    """prepare() и каждый график по отдельности, в этом процессе."""
+    import analyze
+    analyze.GR = out
+    out.mkdir(exist_ok=True)
+    t = time.perf_counter()
+    cache, compute = analyze.prepare(analyze.load(c))
+    res = {"analyze.prepare": time.perf_counter() - t}
+    analyze._init(cache)
+    for fn in analyze.CHARTS:
+        res[f"chart.{fn.__name__}"] = analyze.render(fn.__name__)[1]
+    return res
+
+def main():
+    ap = argparse.ArgumentParser(description="Бенчмарки этапов конвейера")
+    ap.add_argument("--rows", type=int, default=10_000)
+    ap.add_argument("--save-rows", type=int, default=5_000)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--dup", type=float, default=0.1)
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--only", default="", help="через запятую: префиксы этапов")
+    ap.add_argument("--out", default=None)
+    a = ap.parse_args()
+    want = lambda name: not a.only or any(name.startswith(p) for p in a.only.split(","))
+
+    rows = list(corpus.articles(a.rows, a.seed, dup=a.dup))
+    small = rows[:a.save_rows]
+    res: dict[str, dict] = {}
+
+    def record(name: str, n: int, sec: float, **extra) -> None:
+        res[name] = dict(n=n, seconds=round(sec, 6), per_s=round(n / sec, 1) if sec else None,
+                         **extra)
+        print(f"{name:<32}{n:>10,}{sec * 1e3:>12.1f} ms{n / sec if sec else 0:>14,.0f} /s")
+
+    raw_dates = [r["publishedAt"] for r in rows]
+    if want("dates"):
+        def cold():
+            dates._parse.cache_clear()
+            dates.parse_many(raw_dates)
+        record("dates", len(rows), best(cold, a.repeat))
+    if want("normalize"):
+        record("normalize", len(rows), best(lambda: clean(rows), a.repeat))
+    cleaned = clean(rows)
+    if want("categorize"):
+        record("categorize", len(rows), best(lambda: database.categorize(cleaned), a.repeat))
+    if want("parse"):
+        docs = list(corpus.feeds(rows))
+        record("parse", len(rows), best(lambda: [rss.parse("", n, b) for n, b in docs], a.repeat),
+               feeds=len(docs))
+
+    with tempfile.TemporaryDirectory() as d:
+        batch = classified(clean(small))
+        if want("save"):
+            fresh_db(d, "save")
+            t = time.perf_counter()
+            ins, dup = database.save(batch)
+            record("save", len(batch), time.perf_counter() - t, inserted=ins)
+        if want("sentiment") or want("analyze") or want("chart"):
+            fresh_db(d, "sent")
+            database.save(batch)
+            with sqlite3.connect(database.DB) as c:
+                try:
+                    t = time.perf_counter()
+                    n = score_all(c)
+                    if want("sentiment"): record("sentiment", n, time.perf_counter() - t)
+                except LookupError as e:                    # нет vader_lexicon
+                    res["sentiment"] = dict(skipped=str(e).strip().splitlines()[0])
+                    print("sentiment: пропущено — нет vader_lexicon")
+                if want("analyze") or want("chart"):
+                    for k, v in charts(c, Path(d) / "graphs").items():
+                        if want(k): record(k, 1, v)
+        if want("e2e"):
+            fresh_db(d, "e2e")
+            t = time.perf_counter()
+            parsed = [a for n, b in corpus.feeds(small) for a in rss.parse("", n, b)]
+            database.save(classified(parsed))
+            with sqlite3.connect(database.DB) as c:
+                try:
+                    score_all(c)
+                except LookupError:
+                    pass
+                charts(c, Path(d) / "graphs_e2e")
+            record("e2e", len(small), time.perf_counter() - t)
+
+    out = dict(
+        meta=dict(commit=commit(), date=datetime.utcnow().isoformat(timespec="seconds"),
+                  python=platform.python_version(), sqlite=sqlite3.sqlite_version,
+                  platform=platform.platform(), cpus=os.cpu_count(),
+                  rows=a.rows, save_rows=a.save_rows, seed=a.seed, dup=a.dup, repeat=a.repeat),
+        results=res,
+    )
+    path = Path(a.out or f"bench-{out['meta']['commit'] or 'local'}.json")
+    path.write_text(json.dumps(out, ensure_ascii=False, indent=2))
+    print(f"✓ {path}")
+
+if __name__ == "__main__":
+    main()
@@ -4,88 +4,351 @@
 
 ▪ путь к базе задаётся env DB_PATH  
 ▪ если переменная не задана — news.db рядом со скриптом
+▪ схема версионируется (PRAGMA user_version), старые файлы обновляются сами
 """
 
-import os, re, sqlite3
+import hashlib, json, os, sqlite3
 from datetime import datetime
 from pathlib import Path
 
+import aggregates, dates, dedup, entities, metrics, normalize
+
 DB = Path(os.getenv("DB_PATH", Path(__file__).parent / "news.db"))
 
-# ─── создание таблицы (если ещё нет) ───────────────────────
+# ─── схема v4 ──────────────────────────────────────────────
+# articles — физическая таблица: время — INTEGER (unix, UTC),
+# источник и политик — ссылки на словари sources / entities.
+# news — представление со старыми колонками (для ноутбуков, Superset, pandas).
+# v3 — articles.raw: исходный HTML (zlib, см. normalize.py), текст очищен.
+# v4 — формат подписей minhash / lsh_bands (пакетный расчёт в dedup.py).
+SCHEMA_VERSION = 4
+
+TABLES = [
+    "CREATE TABLE IF NOT EXISTS sources  (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS entities (id INTEGER PRIMARY KEY, name TEXT UNIQUE NOT NULL)",
+    """CREATE TABLE IF NOT EXISTS articles (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           source_id INTEGER REFERENCES sources(id),
+           title TEXT,
+           url TEXT UNIQUE,
+           published_ts INTEGER,
+           content TEXT,
+           entity_id INTEGER REFERENCES entities(id),
+           sentiment TEXT,
+           compound REAL, pos REAL, neu REAL, neg REAL,
+           text_hash TEXT,
+           cluster_id INTEGER,
+           raw BLOB                      -- исходный HTML (zlib), см. normalize.py
+       )""",
+    # диапазоны дат (search, export, analyze), партиция месяц × политик + отпечаток export
+    "CREATE INDEX IF NOT EXISTS articles_ts ON articles(published_ts)",
+    "CREATE INDEX IF NOT EXISTS articles_entity_ts ON articles(entity_id, published_ts, compound)",
+    "CREATE INDEX IF NOT EXISTS articles_source_ts ON articles(source_id, published_ts)",
+    # очередь sentiment: только неоценённые строки
+    "CREATE INDEX IF NOT EXISTS articles_unscored ON articles(id) WHERE compound IS NULL",
+    "CREATE INDEX IF NOT EXISTS articles_text_hash ON articles(text_hash)",
+    "CREATE INDEX IF NOT EXISTS articles_cluster ON articles(cluster_id)",
+    """CREATE TABLE IF NOT EXISTS feeds (
+           url TEXT PRIMARY KEY,
+           etag TEXT,
+           last_modified TEXT,
+           body_hash TEXT,
+           seen_ids TEXT,
+           checked_at TEXT
+       )""",
+]
+
+VIEW = """CREATE VIEW IF NOT EXISTS news AS
+          SELECT a.id, s.name AS source, a.title, a.url,
+                 datetime(a.published_ts, 'unixepoch') AS published_at,
+                 a.content, e.name AS politician, a.sentiment,
+                 a.compound, a.pos, a.neu, a.neg, a.text_hash, a.cluster_id
+          FROM articles a
+          LEFT JOIN sources  s ON s.id = a.source_id
+          LEFT JOIN entities e ON e.id = a.entity_id"""
+
+# ─── создание / миграция (PRAGMA user_version) ─────────────
 def create() -> None:
+    """
+    Приводит news.db к SCHEMA_VERSION одной транзакцией:
+    0 → 1 — недостающие колонки старой таблицы news (+ text_hash);
+    1 → 2 — articles + словари, news становится представлением;
+    2 → 3 — title/content очищаются от HTML (normalize.py), исходник — в raw;
+    3 → 4 — новые подписи MinHash (dedup.py), кластеры перепечаток заново.
+    Новая база создаётся сразу в последней версии. Если версия актуальна —
+    ничего не делает.
+    """
     DB.parent.mkdir(parents=True, exist_ok=True)
+    c = sqlite3.connect(DB, isolation_level=None)
+    try:
+        if c.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION: return
+        c.execute("BEGIN IMMEDIATE")
+        v = c.execute("PRAGMA user_version").fetchone()[0]
+        if v != SCHEMA_VERSION:
+            legacy = c.execute("SELECT 1 FROM sqlite_master "
+                               "WHERE type='table' AND name='news'").fetchone()
+            old = legacy or v > 0
+            if legacy and v < 1: migrate_v1(c)
+            for stmt in TABLES: c.execute(stmt)
+            if legacy: migrate_v2(c)
+            c.execute(VIEW)
+            dedup.create(c)
+            if old and v < 3: migrate_v3(c)
+            elif old and v < 4: migrate_v4(c)
+            lo = c.execute("SELECT min(id) - 1 FROM articles WHERE cluster_id IS NULL").fetchone()[0]
+            if lo is not None: dedup.assign(c, lo)
+            aggregates.create(c)
+            if old: aggregates.rebuild(c)
+            create_fts(c)
+            c.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        c.execute("COMMIT")
+    except BaseException:
+        if c.in_transaction: c.execute("ROLLBACK")
+        raise
+    finally:
+        c.close()
+
+# ─── полнотекстовый индекс (FTS5) ──────────────────────────
+FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_ai AFTER INSERT ON articles BEGIN
+           INSERT INTO news_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_ad AFTER DELETE ON articles BEGIN
+           INSERT INTO news_fts(news_fts, rowid, title, content)
+           VALUES ('delete', old.id, old.title, old.content);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS articles_fts_au AFTER UPDATE OF title, content ON articles BEGIN
+           INSERT INTO news_fts(news_fts, rowid, title, content)
+           VALUES ('delete', old.id, old.title, old.content);
+           INSERT INTO news_fts(rowid, title, content) VALUES (new.id, new.title, new.content);
+       END""",
+]
+
+def create_fts(c: sqlite3.Connection) -> None:
+    """
+    news_fts — FTS5 по title/content поверх articles (external content),
+    синхронизируется триггерами; для старой базы индекс строится один раз.
+    """
+    fresh = not c.execute(
+        "SELECT 1 FROM sqlite_master WHERE name='news_fts'").fetchone()
+    c.execute("""CREATE VIRTUAL TABLE IF NOT EXISTS news_fts USING fts5(
+                     title, content, content='articles', content_rowid='id',
+                     tokenize='unicode61 remove_diacritics 2')""")
+    for stmt in FTS_TRIGGERS: c.execute(stmt)
+    if fresh:
+        c.execute("INSERT INTO news_fts(news_fts) VALUES ('rebuild')")
+
+# ─── миграции старых news.db ───────────────────────────────
+NEW_COLUMNS = {
+    "compound": "REAL", "pos": "REAL", "neu": "REAL", "neg": "REAL",
+    "text_hash": "TEXT", "cluster_id": "INTEGER",
+}
+
+def migrate_v1(c: sqlite3.Connection) -> None:
+    """Старая таблица news: добавить недостающие колонки, заполнить text_hash."""
+    have = {r[1] for r in c.execute("PRAGMA table_info(news)")}
+    for col, typ in NEW_COLUMNS.items():
+        if col not in have:
+            c.execute(f"ALTER TABLE news ADD COLUMN {col} {typ}")
+    if "text_hash" not in have:
+        last = 0
+        while True:
+            rows = c.execute(
+                "SELECT id, title, content FROM news WHERE id > ? ORDER BY id LIMIT 5000",
+                (last,),
+            ).fetchall()
+            if not rows: break
+            c.executemany("UPDATE news SET text_hash=? WHERE id=?",
+                          [(text_hash(t, x), i) for i, t, x in rows])
+            last = rows[-1][0]
+
+def migrate_v2(c: sqlite3.Connection) -> None:
+    """news (TEXT-даты, строки) → articles (unix-время, словари); id сохраняются."""
+    c.execute("INSERT OR IGNORE INTO sources(name) "
+              "SELECT DISTINCT source FROM news WHERE source IS NOT NULL")
+    c.execute("INSERT OR IGNORE INTO entities(name) "
+              "SELECT DISTINCT politician FROM news WHERE politician IS NOT NULL")
+    c.execute(
+        """INSERT INTO articles (id, source_id, title, url, published_ts, content, entity_id,
+                                 sentiment, compound, pos, neu, neg, text_hash, cluster_id)
+           SELECT n.id, s.id, n.title, n.url, CAST(strftime('%s', n.published_at) AS INTEGER),
+                  n.content, e.id, n.sentiment, n.compound, n.pos, n.neu, n.neg,
+                  n.text_hash, n.cluster_id
+           FROM news n
+           LEFT JOIN sources  s ON s.name = n.source
+           LEFT JOIN entities e ON e.name = n.politician"""
+    )
+    for t in ("news_fts_ai", "news_fts_ad", "news_fts_au"):
+        c.execute(f"DROP TRIGGER IF EXISTS {t}")
+    c.execute("DROP TABLE IF EXISTS news_fts")
+    c.execute("DROP TABLE news")
+
+def migrate_v3(c: sqlite3.Connection) -> None:
+    """
+    Очистка уже сохранённых статей порциями. Если убраны не только лишние
+    пробелы, оценка сбрасывается (sentiment_analysis.py оценит чистый текст
+    заново); кластеры перепечаток строятся с нуля.
+    """
+    if "raw" not in {r[1] for r in c.execute("PRAGMA table_info(articles)")}:
+        c.execute("ALTER TABLE articles ADD COLUMN raw BLOB")
+    last = 0
+    while True:
+        rows = c.execute(
+            "SELECT id, title, content FROM articles WHERE id > ? ORDER BY id LIMIT 5000",
+            (last,),
+        ).fetchall()
+        if not rows: break
+        upd, rescore = [], []
+        for i, title, cont in rows:
+            t, x = normalize.text(title), normalize.text(cont)
+            if (t, x) == (title or "", cont or ""): continue
+            upd.append((t, x, normalize.pack(cont, x), text_hash(t, x), i))
+            if normalize.changed(title, t) or normalize.changed(cont, x):
+                rescore.append((i,))                # не только пробелы — оценить заново
+        c.executemany("UPDATE articles SET title=?, content=?, raw=?, text_hash=? WHERE id=?",
+                      upd)
+        c.executemany("""UPDATE articles SET sentiment=NULL, compound=NULL,
+                             pos=NULL, neu=NULL, neg=NULL WHERE id=?""", rescore)
+        last = rows[-1][0]
+    reset_clusters(c)
+
+def migrate_v4(c: sqlite3.Connection) -> None:
+    """v3 → v4: подписи MinHash и хэши полос считаются пакетно (dedup.signatures /
+    bands) и не совпадают с прежними — кластеры назначаются заново."""
+    reset_clusters(c)
+
+def reset_clusters(c: sqlite3.Connection) -> None:
+    c.execute("DELETE FROM lsh_bands")
+    c.execute("DELETE FROM minhash")
+    c.execute("UPDATE articles SET cluster_id = NULL")
+
+# ─── хэш нормализованного текста ───────────────────────────
+def text_hash(title: str | None, content: str | None) -> str:
+    """Хэш заголовка+текста без учёта регистра и пробелов — ловит перепечатки под другими url."""
+    norm = " ".join(f"{title or ''} {content or ''}".split()).casefold()
+    return hashlib.blake2b(norm.encode(), digest_size=16).hexdigest()
+
+# ─── состояние лент (conditional GET) ──────────────────────
+def feed_states() -> dict[str, dict]:
+    """url → {etag, last_modified, body_hash, seen_ids:set} для всех лент."""
+    create()
+    with sqlite3.connect(DB) as c:
+        rows = c.execute(
+            "SELECT url, etag, last_modified, body_hash, seen_ids FROM feeds"
+        ).fetchall()
+    return {
+        u: dict(etag=e, last_modified=lm, body_hash=h,
+                seen_ids=set(json.loads(ids or "[]")))
+        for u, e, lm, h, ids in rows
+    }
+
+def save_feed_states(states: dict[str, dict]) -> None:
+    if not states: return
+    create()
+    now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
     with sqlite3.connect(DB) as c:
-        c.execute(
-            """CREATE TABLE IF NOT EXISTS news (
-                   id INTEGER PRIMARY KEY AUTOINCREMENT,
-                   source TEXT,
-                   title TEXT,
-                   url TEXT UNIQUE,
-                   published_at TEXT,
-                   content TEXT,
-                   politician TEXT,
-                   sentiment TEXT
-               )"""
+        c.executemany(
+            """INSERT OR REPLACE INTO feeds
+               (url, etag, last_modified, body_hash, seen_ids, checked_at)
+               VALUES (?,?,?,?,?,?)""",
+            [
+                (u, st.get("etag"), st.get("last_modified"), st.get("body_hash"),
+                 json.dumps(sorted(st.get("seen_ids", ()))), now)
+                for u, st in states.items()
+            ],
         )
 
-# ─── унификация дат ────────────────────────────────────────
-def fix_date(raw: str | None) -> str:
-    """ISO → 'YYYY-MM-DD HH:MM:SS' или текущий момент, если что-то пошло не так."""
-    if not raw:
-        return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-    raw = raw.rstrip("Z")
-    if "+" in raw: raw = raw.split("+")[0]
-    if "." in raw: raw = raw.split(".")[0]
-    try:
-        return datetime.strptime(raw, "%Y-%m-%dT%H:%M:%S") \
-                       .strftime("%Y-%m-%d %H:%M:%S")
-    except ValueError:
-        return datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+# ─── соединение ─────────────────────────────────────────────
+def connect() -> sqlite3.Connection:
+    """
+    Одно настроенное соединение на весь запуск:
+    WAL-журнал, synchronous=NORMAL, кэш страниц 64 МБ.
+    sqlite3 кэширует подготовленные выражения, executemany их переиспользует.
+    """
+    create()
+    c = sqlite3.connect(DB)
+    c.execute("PRAGMA journal_mode=WAL")
+    c.execute("PRAGMA synchronous=NORMAL")
+    c.execute("PRAGMA temp_store=MEMORY")
+    c.execute("PRAGMA cache_size=-65536")
+    return c
 
 # ─── вставка статей ─────────────────────────────────────────
-def save(rows: list[dict]) -> None:
-    if not rows: return
-    create()
-    with sqlite3.connect(DB) as c:
-        cur = c.cursor()
-        n = 0
-        for a in rows:
-            cur.execute(
-                """INSERT OR IGNORE INTO news
-                   (source, title, url, published_at, content, politician)
-                   VALUES (?,?,?,?,?,?)""",
-                (
-                    a["source"],
-                    a["title"],
-                    a["url"],
-                    fix_date(a["publishedAt"]),
-                    a["content"],
-                    a["politician"],
-                ),
-            )
-            n += cur.rowcount
-        if n:
-            print(f"✓ сохранено новых статей: {n}")
+BATCH = 5000          # строк на один executemany
 
-# ─── детект имен в тексте ──────────────────────────────────
-PATTERNS = {
-    "Trump": re.compile(r"\btrump\b", re.I),
-    "Putin": re.compile(r"\bputin\b", re.I),
-    "Xi":    re.compile(r"\bxi\s+j(?:i|inping)\b|\bxi\bjinping\b", re.I),
-}
+INSERT = """INSERT OR IGNORE INTO articles
+            (source_id, title, url, published_ts, content, entity_id, text_hash, raw)
+            VALUES (?,?,?,?,?,?,?,?)"""
+
+def ids(c: sqlite3.Connection, table: str, names: set[str]) -> dict[str, int]:
+    """name → id в словаре sources / entities; недостающие имена добавляются."""
+    names = {n for n in names if n is not None}
+    if not names: return {}
+    c.executemany(f"INSERT OR IGNORE INTO {table}(name) VALUES (?)", [(n,) for n in names])
+    q = ",".join("?" * len(names))
+    return dict(c.execute(f"SELECT name, id FROM {table} WHERE name IN ({q})", [*names]))
+
+def save(rows: list[dict], conn: sqlite3.Connection | None = None) -> tuple[int, int]:
+    """
+    Пакетная вставка одной транзакцией (вместе с кластерами перепечаток
+    и обновлением агрегатов).
+    Текст в rows уже очищен (normalize.text); a["raw"] — исходный HTML, если есть.
+    Статьи с неразборчивой датой (dates.parse_many → None) не пишутся.
+    conn — общее соединение из connect(); если None, открывается своё.
+    Возвращает (вставлено, дубликатов).
+    """
+    if not rows: return 0, 0
+    ts = dates.parse_many([a["publishedAt"] for a in rows])
+    if None in ts:
+        keep = [i for i, t in enumerate(ts) if t is not None]
+        metrics.inc("news_rows_total", len(rows) - len(keep), result="bad_date")
+        print(f"⚠️ пропущено статей без разборчивой даты: {len(rows) - len(keep)}")
+        rows, ts = [rows[i] for i in keep], [ts[i] for i in keep]
+        if not rows: return 0, 0
+    c = conn or connect()
+    n = 0
+    try:
+        with metrics.timer("news_stage_seconds", stage="save"), c:
+            lo = c.execute("SELECT coalesce(max(id), 0) FROM articles").fetchone()[0]
+            src = ids(c, "sources",  {a["source"] for a in rows})
+            ent = ids(c, "entities", {a["politician"] for a in rows})
+            for i in range(0, len(rows), BATCH):
+                n += c.executemany(              # rowcount без изменений из триггеров
+                    INSERT,
+                    [
+                        (src.get(a["source"]), a["title"], a["url"], t, a["content"],
+                         ent.get(a["politician"]), text_hash(a["title"], a["content"]),
+                         normalize.pack(a.get("raw"), a["content"]))
+                        for a, t in zip(rows[i:i + BATCH], ts[i:i + BATCH])
+                    ],
+                ).rowcount
+            with metrics.timer("news_stage_seconds", stage="dedup"):
+                dedup.assign(c, lo)
+            with metrics.timer("news_stage_seconds", stage="aggregates"):
+                aggregates.refresh(c)
+    finally:
+        if conn is None: c.close()
+    metrics.inc("news_rows_total", n, result="inserted")
+    metrics.inc("news_rows_total", len(rows) - n, result="duplicate")
+    if n:
+        print(f"✓ сохранено новых статей: {n}")
+    return n, len(rows) - n
 
+# ─── детект имен в тексте ──────────────────────────────────
 def categorize(rows: list[dict]) -> dict[str, list[dict]]:
     """
-    Разбивает список статей на 4 корзины:
-    Trump / Putin / Xi / Mixed (если упоминается ≥2 имён).
+    Разбивает список статей на корзины по персонам из entities.py
+    (Trump / Putin / Xi / …) и Mixed (если упоминается ≥2 имён).
+    Заголовок и текст сканируются одним общим регулярным выражением.
     """
-    outs = {k: [] for k in ["Trump", "Putin", "Xi", "Mixed"]}
+    outs = {k: [] for k in [*entities.NAMES, "Mixed"]}
     for a in rows:
-        text = " ".join((a.get("title", ""), a.get("content", ""))).lower()
-        hit = {p for p, pat in PATTERNS.items() if pat.search(text)}
-        if   hit == {"Trump"}: outs["Trump"].append(a)
-        elif hit == {"Putin"}: outs["Putin"].append(a)
-        elif hit == {"Xi"}:    outs["Xi"].append(a)
-        elif hit:              outs["Mixed"].append(a)
+        pol = politician(a)
+        if pol: outs[pol].append(a)
     return outs
+
+def politician(a: dict) -> str | None:
+    """Корзина одной статьи: имя, Mixed (≥2 имён) или None — никого нет."""
+    hit = entities.names(a.get("title", ""), a.get("content", ""))
+    if len(hit) == 1: return hit.pop()
+    return "Mixed" if hit else None
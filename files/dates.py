@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Даты публикации → unix-время (UTC) для articles.published_ts.
+
+▪ ISO 8601: «Z», смещения ±HH:MM / ±HHMM / ±HH, дробные секунды,
+  пробел вместо «T», только дата; без зоны — считается UTC
+▪ RFC 822 / 2822 (RSS pubDate): «Mon, 28 Apr 2025 08:33:48 -0500», GMT / EST / …,
+  плюс зоны, которых нет в RFC, но которые встречаются в лентах (MSK, CET, JST …)
+▪ смещение применяется, а не отрезается: 08:33:48-05:00 → 13:33:48 UTC
+▪ неразборчивая дата — None (и счётчик news_dates_rejected_total{reason}),
+  а не «сейчас»: выдуманное время портит графики по часам и дням недели
+▪ строки повторяются (одна лента — один момент на десятки записей),
+  поэтому разбор мемоизирован; parse_many() — для пакетной вставки
+"""
+
+import calendar, os, re, time
+from datetime import datetime, timezone
+from email.utils import parsedate_tz
+from functools import lru_cache
+
+import metrics
+
+CACHE = int(os.getenv("DATES_CACHE", 65536))   # уникальных строк в памяти
+MIN_TS = 631152000                              # 1990-01-01: раньше — мусор (0, 1970 …)
+FUTURE = 86400                                  # допуск «из будущего» (часы источника)
+
+# зоны вне RFC 822, которые ставят ленты; часы
+_ZONES = {"MSK": 3, "CET": 1, "CEST": 2, "EET": 2, "EEST": 3, "WET": 0, "WEST": 1,
+          "BST": 1, "IST": 5.5, "PKT": 5, "HKT": 8, "SGT": 8, "JST": 9, "KST": 9,
+          "AEST": 10, "AEDT": 11}
+_RFC   = {"UT", "UTC", "GMT", "Z", "EST", "EDT", "CST", "CDT", "MST", "MDT", "PST", "PDT"}
+_ISO   = re.compile(r"\d{4}-\d\d-\d\d")
+_ZONE  = re.compile(r"\s([A-Za-z]{1,5})$")
+_NOTE  = re.compile(r"\s*\([^)]*\)\s*$")        # «+0300 (MSK)» — комментарий RFC 2822
+
+def _iso(s: str) -> int | None:
+    try:
+        dt = datetime.fromisoformat(s)
+    except ValueError:
+        return None
+    if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+def _rfc(s: str) -> int | str:
+    s = _NOTE.sub("", s)
+    extra = 0
+    m = _ZONE.search(s)
+    if m and m[1].upper() not in _RFC:
+        z = _ZONES.get(m[1].upper())
+        if z is None: return "tz"                   # parsedate_tz молча взял бы UTC
+        s, extra = s[:m.start()], int(z * 3600)
+    t = parsedate_tz(s)
+    if t is None: return "format"
+    return calendar.timegm((*t[:6], 0, 0, 0)) - (t[9] or 0) - extra
+
+@lru_cache(maxsize=CACHE)
+def _parse(raw: str) -> int | str:
+    """Строка → unix-время или причина отказа (str)."""
+    s = raw.strip()
+    if not s: return "empty"
+    ts = _iso(s) if _ISO.match(s) else None
+    if ts is None:
+        ts = _rfc(s)
+        if isinstance(ts, str): return ts
+    return ts if ts >= MIN_TS else "range"
+
+def parse(raw: str | None) -> int | None:
+    """Одна дата → unix-время (UTC) или None."""
+    if not raw: return None
+    ts = _parse(raw)
+    return None if isinstance(ts, str) else ts
+
+def parse_many(raws: list[str | None], now: float | None = None) -> list[int | None]:
+    """
+    Пакет дат → unix-время; None — дата отвергнута (пустая, неразборчивая,
+    неизвестная зона, до 1990 или дальше суток в будущем).
+    Отказы считаются в news_dates_rejected_total{reason}.
+    """
+    limit = (now or time.time()) + FUTURE
+    memo: dict[str | None, int | str] = {}
+    out: list[int | None] = []
+    bad: dict[str, int] = {}
+    for r in raws:
+        ts = memo.get(r)
+        if ts is None:
+            ts = memo[r] = (_parse(r) if r else "empty")
+            if not isinstance(ts, str) and ts > limit: ts = memo[r] = "future"
+        if isinstance(ts, str):
+            bad[ts] = bad.get(ts, 0) + 1
+            out.append(None)
+        else:
+            out.append(ts)
+    for reason, n in bad.items():
+        metrics.inc("news_dates_rejected_total", n, reason=reason)
+    return out
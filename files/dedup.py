@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Поиск перепечаток (near-duplicates) через MinHash + LSH.
+
+▪ шинглы — по 5 слов подряд из заголовка и начала текста
+▪ подпись — 64 минимума хэшей, LSH — 16 полос по 4 значения
+▪ индекс полос (lsh_bands) и подписи (minhash) лежат в той же news.db
+▪ articles.cluster_id — id первой статьи кластера; cluster_id = id — «уникальная история»
+
+Новая статья проверяется против 16 корзин и одной подписи-представителя,
+так что время на вставку не растёт с размером архива. Подписи и хэши полос
+считаются numpy сразу для пакета строк, занятые корзины и подписи кандидатов
+читаются несколькими запросами на пакет, запись — executemany.
+"""
+
+import itertools, json, re, sqlite3, zlib
+
+import numpy as np
+
+NUM_PERM, BANDS = 64, 16
+ROWS      = NUM_PERM // BANDS
+SHINGLE   = 5             # слов в шингле
+MAX_WORDS = 300           # дальше начала статьи не смотрим
+THRESHOLD = 0.8           # оценка Жаккара для попадания в кластер
+CHUNK     = 2000          # строк articles за проход assign()
+SIG_BATCH = 256           # текстов на одну матрицу numpy (64 × шинглы × 8 байт)
+
+# 64 хэш-функции multiply-shift: (a·x + b) mod 2^64, старшие 32 бита; a — нечётное
+_M = np.uint64(0x9E3779B97F4A7C15)               # нечётный множитель для свёртки хэшей
+_rng = np.random.default_rng(20250601)
+_A = (_rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64) * 2 + 1)[:, None]
+_B = _rng.integers(0, 2**63, NUM_PERM, dtype=np.uint64)[:, None]
+_32 = np.uint64(32)
+
+def create(c: sqlite3.Connection) -> None:
+    c.execute("""CREATE TABLE IF NOT EXISTS lsh_bands (
+                     band INTEGER, bucket INTEGER, cluster INTEGER,
+                     PRIMARY KEY (band, bucket)
+                 ) WITHOUT ROWID""")
+    c.execute("CREATE TABLE IF NOT EXISTS minhash (id INTEGER PRIMARY KEY, sig BLOB)")
+
+# ─── подпись ───────────────────────────────────────────────
+def words(title: str | None, content: str | None) -> list[str]:
+    return re.findall(r"\w+", f"{title or ''} {content or ''}".casefold())[:MAX_WORDS]
+
+def shingles(texts: list[list[str]]) -> tuple[np.ndarray, np.ndarray]:
+    """
+    32-битные хэши шинглов всех текстов подряд и начало каждого текста в них.
+    Хэш шингла — свёртка crc32 пяти слов; текст короче 5 слов — один шингл,
+    текст без слов — шингл из одних нулей (одинаковый для всех пустых).
+    """
+    pad = (0,) * SHINGLE                         # шингл не заходит в следующий текст
+    h = np.fromiter(itertools.chain.from_iterable(
+            itertools.chain(map(zlib.crc32, map(str.encode, w)), pad) for w in texts),
+        np.uint64)
+    span = len(h) - (SHINGLE - 1)
+    g = np.zeros(span, np.uint64)
+    for k in range(SHINGLE):
+        g = g * _M + h[k:k + span]
+    g = (g >> np.uint64(32)) ^ (g & np.uint64(0xFFFFFFFF))
+    n = np.array([len(w) for w in texts])
+    count = np.maximum(1, n - (SHINGLE - 1))     # шинглов в тексте
+    start = np.concatenate(([0], np.cumsum(n + SHINGLE)[:-1]))
+    offs = np.concatenate(([0], np.cumsum(count)[:-1]))
+    idx = np.repeat(start - offs, count) + np.arange(count.sum())
+    return g[idx], offs
+
+def signatures(rows: list[tuple[str | None, str | None]]) -> np.ndarray:
+    """Подписи пакета (title, content): матрица len(rows) × 64, uint32."""
+    out = np.empty((len(rows), NUM_PERM), np.uint32)
+    for i in range(0, len(rows), SIG_BATCH):
+        x, offs = shingles([words(t, c) for t, c in rows[i:i + SIG_BATCH]])
+        out[i:i + SIG_BATCH] = np.minimum.reduceat((_A * x + _B) >> _32, offs, axis=1).T
+    return out
+
+def bands(sigs: np.ndarray) -> np.ndarray:
+    """Хэши 16 полос для каждой подписи (n × 16), 56 бит — влезают в INTEGER SQLite."""
+    b = sigs.reshape(len(sigs), BANDS, ROWS).astype(np.uint64)
+    h = np.zeros((len(sigs), BANDS), np.uint64)
+    for k in range(ROWS):
+        h = (h ^ b[:, :, k]) * _M
+    h ^= h >> np.uint64(29)
+    return (h >> np.uint64(8)).astype(np.int64)
+
+# ─── назначение кластеров ──────────────────────────────────
+def _known(c: sqlite3.Connection, bk: np.ndarray) -> tuple[dict, dict]:
+    """
+    Корзины пакета, уже занятые в lsh_bands, и подписи их кластеров:
+    по запросу на полосу (список корзин — JSON-массивом) и один на подписи.
+    """
+    known = {}
+    for b in range(BANDS):
+        for h, cl in c.execute("""SELECT bucket, cluster FROM lsh_bands
+                                  WHERE band = ? AND bucket IN (SELECT value FROM json_each(?))""",
+                               (b, json.dumps(bk[:, b].tolist()))):
+            known[b, h] = cl
+    reps = {i: np.frombuffer(sig, np.uint32) for i, sig in c.execute(
+        "SELECT id, sig FROM minhash WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(sorted(set(known.values()))),))}
+    return known, reps
+
+def assign(c: sqlite3.Connection, since_id: int) -> int:
+    """
+    Кластеры для всех строк с id > since_id (в порядке id).
+    Внутри пакета строки идут по порядку: статья может попасть в кластер
+    другой статьи того же пакета, как при вставке по одной.
+    Возвращает, сколько из них оказались перепечатками.
+    """
+    dup, last = 0, since_id
+    while True:
+        rows = c.execute(
+            "SELECT id, title, content FROM articles WHERE id > ? ORDER BY id LIMIT ?",
+            (last, CHUNK),
+        ).fetchall()
+        if not rows: return dup
+        sigs = signatures([(t, x) for _, t, x in rows])
+        bk = bands(sigs)
+        known, reps = _known(c, bk)
+        new_sigs, new_bands, clusters = [], [], []
+        for (_id, *_), sig, row in zip(rows, sigs, bk.tolist()):
+            keys = list(enumerate(row))
+            cands = sorted({cl for k in keys if (cl := known.get(k)) in reps})
+            cluster = _id
+            if cands:
+                sim = (np.stack([reps[cl] for cl in cands]) == sig).mean(axis=1)  # оценка Жаккара
+                hit = np.flatnonzero(sim >= THRESHOLD)
+                if len(hit):
+                    cluster = cands[hit[0]]; dup += 1
+            if cluster == _id:
+                reps[_id] = sig
+                new_sigs.append((_id, sig.tobytes()))
+            for k in keys:                       # корзина достаётся первому кластеру
+                if k not in known:
+                    known[k] = cluster
+                    new_bands.append((*k, cluster))
+            clusters.append((cluster, _id))
+        new_bands.sort()                         # по ключу lsh_bands — вставка по порядку
+        c.executemany("INSERT OR REPLACE INTO minhash VALUES (?, ?)", new_sigs)
+        c.executemany("INSERT OR IGNORE INTO lsh_bands VALUES (?, ?, ?)", new_bands)
+        c.executemany("UPDATE articles SET cluster_id=? WHERE id=?", clusters)
+        last = rows[-1][0]
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Реестр отслеживаемых персон и поиск всех имён за один проход по тексту.
+
+▪ ENTITIES: имя → алиасы (латиница, кириллица с падежами, иероглифы)
+▪ свой реестр — JSON-файл того же вида, путь в env ENTITIES_PATH
+▪ все алиасы склеены в одно регулярное выражение-альтернативу,
+  поэтому новая персона почти не добавляет времени на статью
+"""
+
+import json, os, re
+
+ENTITIES = {
+    "Trump": ["Trump", "Donald Trump",
+              "Трамп", "Трампа", "Трампу", "Трампом", "Трампе",
+              "特朗普"],
+    "Putin": ["Putin", "Vladimir Putin",
+              "Путин", "Путина", "Путину", "Путиным", "Путине",
+              "普京"],
+    "Xi":    ["Xi Jinping", "Xi Jin-ping",
+              "Си Цзиньпин", "Си Цзиньпина", "Си Цзиньпину", "Си Цзиньпином", "Си Цзиньпине",
+              "习近平"],
+}
+
+def load() -> dict[str, list[str]]:
+    path = os.getenv("ENTITIES_PATH")
+    if not path:
+        return ENTITIES
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def _key(s: str) -> str:
+    return " ".join(s.split()).casefold()
+
+def _cjk(s: str) -> bool:
+    return any("⺀" <= ch <= "鿿" for ch in s)
+
+def build(entities: dict[str, list[str]]) -> tuple[re.Pattern, dict[str, str]]:
+    """
+    Компилирует реестр в (regex, alias→имя).
+    Для слов — границы (?<!\\w)…(?!\\w), для иероглифов границ нет.
+    """
+    alias = {_key(a): name for name, al in entities.items() for a in al}
+    words = sorted((a for a in alias if not _cjk(a)), key=len, reverse=True)
+    cjk   = sorted((a for a in alias if _cjk(a)), key=len, reverse=True)
+    esc   = lambda a: r"\s+".join(map(re.escape, a.split()))
+    parts = []
+    if words: parts.append(r"(?<!\w)(?:" + "|".join(map(esc, words)) + r")(?!\w)")
+    if cjk:   parts.append("|".join(map(esc, cjk)))
+    return re.compile("|".join(parts) or r"(?!)", re.I), alias
+
+REGISTRY = load()
+NAMES = list(REGISTRY)
+PATTERN, ALIAS = build(REGISTRY)
+
+# ─── поиск ─────────────────────────────────────────────────
+def find(text: str) -> dict[str, list[int]]:
+    """Имя → позиции всех упоминаний в тексте (один проход)."""
+    out: dict[str, list[int]] = {}
+    for m in PATTERN.finditer(text or ""):
+        out.setdefault(ALIAS[_key(m.group())], []).append(m.start())
+    return out
+
+def counts(text: str) -> dict[str, int]:
+    return {k: len(v) for k, v in find(text).items()}
+
+def names(*texts: str) -> set[str]:
+    """Множество упомянутых имён во всех переданных текстах."""
+    return {ALIAS[_key(m.group())] for t in texts for m in PATTERN.finditer(t or "")}
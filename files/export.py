@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+Выгрузка news в Parquet-датасет рядом с news.db:
+
+    parquet/month=2025-04/politician=Trump/part-0.parquet
+
+▪ published_at — timestamp UTC, source / sentiment — категории (dictionary)
+▪ перезаписываются только партиции, у которых изменился «отпечаток»
+  (число строк, max(id), число оценённых, сумма compound) — таблица export_state;
+  смена одних только меток (sentiment_analysis --relabel) compound не трогает,
+  поэтому relabel() сбрасывает состояние целиком — reset()
+▪ news.csv — по желанию: EXPORT_CSV=1 или --csv
+
+Чтение одного месяца — load_month("2025-04"), без разбора всего CSV.
+"""
+
+import argparse, os, shutil, sqlite3
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+import database
+
+DB   = Path(os.getenv("DB_PATH", Path(__file__).parent / "news.db"))
+ROOT = DB.parent
+OUT  = Path(os.getenv("EXPORT_DIR", ROOT / "parquet"))
+CSV  = ROOT / "news.csv"
+WRITE_CSV = os.getenv("EXPORT_CSV", "0") == "1"
+
+COLUMNS = """a.id, s.name AS source, a.title, a.url,
+             datetime(a.published_ts, 'unixepoch') AS published_at, a.content,
+             a.sentiment, a.compound, a.pos, a.neu, a.neg"""
+
+def create(c: sqlite3.Connection) -> None:
+    c.execute("""CREATE TABLE IF NOT EXISTS export_state (
+                     month TEXT, politician TEXT, fingerprint TEXT,
+                     PRIMARY KEY (month, politician)
+                 ) WITHOUT ROWID""")
+
+def reset(c: sqlite3.Connection) -> None:
+    """Забыть отпечатки: следующий run() перепишет все партиции."""
+    create(c)
+    c.execute("DELETE FROM export_state")
+
+def fingerprints(c: sqlite3.Connection) -> dict[tuple[str, str], str]:
+    """(месяц, политик) → отпечаток; читается из индекса articles_entity_ts."""
+    return {
+        (m, p): f"{n}:{mx}:{sc}:{tot:.6f}"
+        for m, p, n, mx, sc, tot in c.execute(
+            """SELECT strftime('%Y-%m', a.published_ts, 'unixepoch'), e.name,
+                      count(*), max(a.id), count(a.compound), total(a.compound)
+               FROM articles a LEFT JOIN entities e ON e.id = a.entity_id
+               WHERE a.published_ts IS NOT NULL
+               GROUP BY 1, 2"""
+        )
+    }
+
+def next_month(month: str) -> str:
+    y, m = map(int, month.split("-"))
+    return f"{y + m // 12}-{m % 12 + 1:02d}"
+
+def partition(month: str, politician: str) -> Path:
+    return OUT / f"month={month}" / f"politician={politician}"
+
+def write(c: sqlite3.Connection, month: str, politician: str) -> int:
+    """Перезаписать одну партицию целиком."""
+    df = pd.read_sql(
+        f"""SELECT {COLUMNS}
+            FROM articles a LEFT JOIN sources s ON s.id = a.source_id
+            WHERE a.entity_id = (SELECT id FROM entities WHERE name = ?)
+              AND a.published_ts >= CAST(strftime('%s', ? || '-01') AS INTEGER)
+              AND a.published_ts <  CAST(strftime('%s', ? || '-01') AS INTEGER)
+            ORDER BY a.id""",
+        c, params=(politician, month, next_month(month)),
+    )
+    df["published_at"] = pd.to_datetime(df["published_at"], utc=True)
+    for col in ("source", "sentiment"):
+        df[col] = df[col].astype("category")
+    for col in ("compound", "pos", "neu", "neg"):
+        df[col] = df[col].astype("float64")
+    d = partition(month, politician)
+    shutil.rmtree(d, ignore_errors=True)
+    d.mkdir(parents=True)
+    pq.write_table(pa.Table.from_pandas(df, preserve_index=False), d / "part-0.parquet")
+    return len(df)
+
+def export_csv(c: sqlite3.Connection) -> None:
+    """news.csv целиком, порциями — для совместимости (Excel, старые ноутбуки)."""
+    CSV.unlink(missing_ok=True)
+    for i, part in enumerate(pd.read_sql("SELECT * FROM news ORDER BY id", c, chunksize=50_000)):
+        part.to_csv(CSV, mode="a", header=i == 0, index=False)
+
+def run(c: sqlite3.Connection, csv: bool = WRITE_CSV) -> tuple[int, int]:
+    """Обновить датасет. Возвращает (переписано партиций, всего партиций)."""
+    create(c)
+    old = dict(((m, p), f) for m, p, f in c.execute("SELECT * FROM export_state"))
+    new = fingerprints(c)
+    changed = [k for k, f in new.items() if old.get(k) != f]
+    for m, p in changed:
+        write(c, m, p)
+    for m, p in old.keys() - new.keys():                       # партиция опустела
+        shutil.rmtree(partition(m, p), ignore_errors=True)
+    with c:
+        c.execute("DELETE FROM export_state")
+        c.executemany("INSERT INTO export_state VALUES (?,?,?)",
+                      [(m, p, f) for (m, p), f in new.items()])
+    if csv: export_csv(c)
+    return len(changed), len(new)
+
+def load_month(month: str, politician: str | None = None) -> pd.DataFrame:
+    """Прочитать одну партицию (или весь месяц) без чтения остального датасета."""
+    path = partition(month, politician) if politician else OUT / f"month={month}"
+    return pd.read_parquet(path)
+
+def main():
+    ap = argparse.ArgumentParser(description="Parquet-выгрузка news.db")
+    ap.add_argument("--csv", action="store_true", default=WRITE_CSV, help="ещё и news.csv")
+    a = ap.parse_args()
+    database.create()
+    with sqlite3.connect(DB) as c:
+        n, total = run(c, a.csv)
+    print(f"✓ parquet: переписано партиций {n} из {total} → {OUT}")
+
+if __name__ == "__main__":
+    main()
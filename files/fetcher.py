@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Параллельная загрузка RSS-лент.
+
+▪ пул потоков (RSS_WORKERS), но не больше RSS_PER_HOST запросов на один хост
+▪ keep-alive: на каждый хост своя requests.Session с пулом соединений
+▪ таймаут на ленту (RSS_TIMEOUT) и повтор с экспоненциальной паузой
+▪ conditional GET: If-None-Match / If-Modified-Since из сохранённого состояния
+"""
+
+import hashlib, os, random, threading, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import metrics
+
+WORKERS  = int(os.getenv("RSS_WORKERS", 16))
+PER_HOST = int(os.getenv("RSS_PER_HOST", 2))
+TIMEOUT  = float(os.getenv("RSS_TIMEOUT", 20))
+RETRIES  = 3                     # попыток на ленту
+BACKOFF  = 1.0                   # пауза 1, 2, 4 … сек (+ случайный шум)
+RETRY_ON = {429, 500, 502, 503, 504}
+
+HEADERS = {"User-Agent": "Mozilla/5.0 (RSS_Project; +https://github.com/vkalinovski/RSS_Project)"}
+
+# ─── сессии и лимиты по хостам ─────────────────────────────
+_lock     = threading.Lock()
+_sessions: dict[str, requests.Session] = {}
+_slots:    dict[str, threading.Semaphore] = {}
+
+def host(url: str) -> str:
+    return urlsplit(url).netloc.lower()
+
+def _host_state(h: str) -> tuple[requests.Session, threading.Semaphore]:
+    with _lock:
+        if h not in _sessions:
+            s = requests.Session()
+            s.headers.update(HEADERS)
+            ad = HTTPAdapter(pool_connections=1, pool_maxsize=PER_HOST)
+            s.mount("http://", ad); s.mount("https://", ad)
+            _sessions[h] = s
+            _slots[h] = threading.Semaphore(PER_HOST)
+        return _sessions[h], _slots[h]
+
+# ─── одна лента ────────────────────────────────────────────
+def fetch(url: str, headers: dict | None = None) -> dict:
+    """
+    Скачивает url и возвращает dict:
+    url, status, body (bytes), headers (CaseInsensitiveDict), elapsed (сек), error.
+    При сетевой ошибке или 429/5xx — до RETRIES попыток с паузой.
+    """
+    sess, slot = _host_state(host(url))
+    res = dict(url=url, status=None, body=b"", headers={}, elapsed=0.0, error=None)
+    t0 = time.perf_counter()
+    for attempt in range(RETRIES):
+        try:
+            with slot:
+                r = sess.get(url, headers=headers, timeout=TIMEOUT)
+                body = r.content
+            res.update(status=r.status_code, body=body, headers=r.headers, error=None)
+            if r.status_code not in RETRY_ON:
+                break
+        except requests.RequestException as e:
+            res["error"] = f"{type(e).__name__}: {e}"
+        if attempt < RETRIES - 1:
+            metrics.inc("news_http_retries_total", host=host(url))
+            time.sleep(BACKOFF * 2 ** attempt * (1 + random.random() / 2))
+    res["elapsed"] = time.perf_counter() - t0
+    return res
+
+# ─── conditional GET ───────────────────────────────────────
+def conditional(state: dict | None) -> dict:
+    """Заголовки If-None-Match / If-Modified-Since по сохранённому состоянию ленты."""
+    h = {}
+    if state and state.get("etag"):          h["If-None-Match"] = state["etag"]
+    if state and state.get("last_modified"): h["If-Modified-Since"] = state["last_modified"]
+    return h
+
+def body_hash(body: bytes) -> str:
+    return hashlib.sha1(body).hexdigest()
+
+# ─── все ленты сразу ───────────────────────────────────────
+def fetch_all(feeds: dict[str, str], states: dict[str, dict] | None = None,
+              workers: int = WORKERS, window: int | None = None):
+    """
+    Генератор (name, result) в порядке готовности.
+    Общее время ≈ самая медленная лента, а не сумма всех.
+    states — url → состояние ленты для conditional GET (см. database.feed_states).
+    window — сколько лент одновременно в работе или ждут разбора (по умолчанию
+    2 × workers): новые загрузки стартуют, только когда потребитель забрал
+    готовые, поэтому в памяти не больше window тел лент.
+    """
+    states, window = states or {}, window or 2 * workers
+    todo = iter(feeds.items())
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futs = {}
+        for name, url in todo:
+            futs[pool.submit(fetch, url, conditional(states.get(url)))] = name
+            if len(futs) >= window: break
+        while futs:
+            done, _ = wait(futs, return_when=FIRST_COMPLETED)
+            for f in done:
+                yield futs.pop(f), f.result()
+                nxt = next(todo, None)
+                if nxt:
+                    futs[pool.submit(fetch, nxt[1], conditional(states.get(nxt[1])))] = nxt[0]
@@ -1,23 +1,31 @@
 # -*- coding: utf-8 -*-
 """
-Исторический сборщик Mediastack (FREE-plan).
+Исторический сборщик Mediastack (backfill).
 
-• диапазон: 01-09-2024 … today  
-• 1 запрос на месяц × 3 персоны → 24 calls (<500/мес)  
-• пауза 1 сек, чтобы не нарваться на rate-limit
+• диапазон: 01-09-2024 … today, месяц × персона
+• постранично: offset += limit, пока API не вернёт пустую страницу
+• лимиты плана — token bucket: MEDIASTACK_RPS запросов/сек
+  и MEDIASTACK_QUOTA запросов за календарный месяц (FREE — 500)
+• прогресс (персона, месяц, offset) хранится в news.db —
+  прерванный backfill продолжается с той же страницы
+• текущий месяц после полного обхода перечитывается с начала только до
+  первой страницы без новых статей (выдача — published_desc)
+• каждая страница сразу уходит в categorize() → save()
+
+MEDIASTACK_URL — другой адрес API (например, локальный фейковый сервер).
 """
 
-import calendar, os, sys, time, requests
+import calendar, os, sqlite3, sys, threading, time, requests
 from datetime import date
 from dotenv import load_dotenv
 
-from database import create, categorize, save
+import metrics
+from database import connect, categorize, save
+from normalize import text
 
 # ─── 1. ключ API ────────────────────────────────────────────
 load_dotenv()
 KEY = os.getenv("MEDIASTACK_KEY")
-if not KEY:
-    sys.exit("❌ MEDIASTACK_KEY не найден (.env или env-var)")
 
 # ─── 2. константы ───────────────────────────────────────────
 START = date(2024, 9, 1)
@@ -29,15 +37,74 @@ PEOPLE = {
     "Xi":    '"Xi Jinping"',
 }
 
-URL  = "http://api.mediastack.com/v1/news"
+URL   = os.getenv("MEDIASTACK_URL", "http://api.mediastack.com/v1/news")
+LIMIT = 100                                           # максимум на страницу
+RPS   = float(os.getenv("MEDIASTACK_RPS", 1))
+QUOTA = int(os.getenv("MEDIASTACK_QUOTA", 500))
 BASE = dict(
-    access_key=KEY,
     languages="en,ru",
     sort="published_desc",
-    limit=100,
+    limit=LIMIT,
 )
 
-# ─── 3. вспомогательные функции ────────────────────────────
+class QuotaExceeded(Exception):
+    """Месячная квота плана исчерпана — продолжим в следующем месяце."""
+
+# ─── 3. ограничение частоты ────────────────────────────────
+class TokenBucket:
+    """rate токенов в секунду, не больше burst про запас; take() ждёт токен."""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate, self.burst = rate, burst
+        self.tokens = float(burst)
+        self.t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.t) * self.rate)
+            self.t = now
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+            self.tokens -= 1                            # в долг — следующий подождёт дольше
+        if wait: time.sleep(wait)
+
+    def pause(self, sec: float) -> None:
+        """Сервер ответил 429 — опустошить ведро на sec секунд."""
+        with self._lock:
+            self.tokens = min(self.tokens, 0.0) - sec * self.rate
+
+# ─── 4. прогресс и расход квоты ────────────────────────────
+def create(c: sqlite3.Connection) -> None:
+    c.execute("""CREATE TABLE IF NOT EXISTS mediastack_progress (
+                     person TEXT, month TEXT, next_offset INTEGER NOT NULL, done INTEGER NOT NULL,
+                     PRIMARY KEY (person, month)
+                 ) WITHOUT ROWID""")
+    c.execute("""CREATE TABLE IF NOT EXISTS mediastack_usage (
+                     month TEXT PRIMARY KEY, calls INTEGER NOT NULL
+                 )""")
+
+def progress(c: sqlite3.Connection, person: str, month: str) -> tuple[int | None, bool]:
+    """(next_offset, done); None — месяц ещё не начинали."""
+    r = c.execute("SELECT next_offset, done FROM mediastack_progress WHERE person=? AND month=?",
+                  (person, month)).fetchone()
+    return (r[0], bool(r[1])) if r else (None, False)
+
+def checkpoint(c: sqlite3.Connection, person: str, month: str, offset: int, done: bool) -> None:
+    c.execute("INSERT OR REPLACE INTO mediastack_progress VALUES (?,?,?,?)",
+              (person, month, offset, int(done)))
+
+def used(c: sqlite3.Connection) -> int:
+    r = c.execute("SELECT calls FROM mediastack_usage WHERE month=?",
+                  (f"{date.today():%Y-%m}",)).fetchone()
+    return r[0] if r else 0
+
+def spend(c: sqlite3.Connection) -> None:
+    c.execute("""INSERT INTO mediastack_usage VALUES (?, 1)
+                 ON CONFLICT (month) DO UPDATE SET calls = calls + 1""",
+              (f"{date.today():%Y-%m}",))
+
+# ─── 5. вспомогательные функции ────────────────────────────
 def month_range():
     """Генератор (first_day, last_day) для всех месяцев между START…TODAY"""
     y, m = START.year, START.month
@@ -46,37 +113,100 @@ def month_range():
         yield date(y, m, 1), date(y, m, last)
         y, m = (y + 1, 1) if m == 12 else (y, m + 1)
 
-def fetch(q: str, frm: date, to: date):
-    params = BASE | {"keywords": q, "date": f"{frm},{to}"}
-    r = requests.get(URL, params=params, timeout=25)
-    if r.status_code != 200:
-        print("⚠️ Mediastack error", r.text[:120])
-        return []
-    return r.json().get("data", [])
+def fetch(c: sqlite3.Connection, bucket: TokenBucket, q: str, frm: date, to: date,
+          offset: int) -> dict | None:
+    """
+    Одна страница: {"data": [...], "pagination": {...}} или None при ошибке.
+    429 — пауза и повтор; QuotaExceeded — квота плана на этот месяц кончилась.
+    """
+    params = BASE | {"access_key": KEY, "keywords": q, "date": f"{frm},{to}", "offset": offset}
+    for attempt in range(5):
+        if used(c) >= QUOTA:
+            raise QuotaExceeded
+        bucket.take()
+        with c: spend(c)
+        try:
+            with metrics.timer("news_mediastack_request_seconds"):
+                r = requests.get(URL, params=params, timeout=25)
+        except requests.RequestException as e:
+            metrics.inc("news_mediastack_requests_total", status="error")
+            print("⚠️ Mediastack error", e); return None
+        metrics.inc("news_mediastack_requests_total", status=r.status_code)
+        metrics.inc("news_http_bytes_total", len(r.content), host="mediastack")
+        try:
+            body = r.json()
+        except ValueError:
+            body = {}
+        if (body.get("error") or {}).get("code") == "usage_limit_reached":
+            raise QuotaExceeded
+        if r.status_code == 429:
+            bucket.pause(2 ** attempt); continue
+        if r.status_code != 200:
+            print("⚠️ Mediastack error", r.text[:120])
+            return None
+        return body
+    return None
 
 def std(a: dict, person: str) -> dict:
     """Приводим ответ Mediastack к единому формату"""
     return dict(
         source=a.get("source") or "",
-        title=a.get("title") or "",
+        title=text(a.get("title")),
         url=a.get("url"),
         publishedAt=a.get("published_at"),
-        content=a.get("description") or "",
+        content=text(a.get("description")),
+        raw=a.get("description"),
         politician=person,
     )
 
-# ─── 4. main ETL ────────────────────────────────────────────
+def backfill(c: sqlite3.Connection, bucket: TokenBucket, person: str, query: str,
+             frm: date, to: date) -> int:
+    """
+    Все страницы одного месяца, начиная с сохранённого offset. Возвращает вставлено.
+    Offset 0 в прогрессе — месяц уже пройден целиком, пока был текущим:
+    новые статьи — в начале выдачи, читаем до страницы, где всё уже есть.
+    """
+    month = f"{frm:%Y-%m}"
+    offset, done = progress(c, person, month)
+    if done: return 0
+    refresh, offset = offset == 0, offset or 0
+    ins = 0
+    while True:
+        page = fetch(c, bucket, query, frm, to, offset)
+        if page is None: return ins                     # ошибка — продолжим в другой раз
+        data = page.get("data", [])
+        total = (page.get("pagination") or {}).get("total")
+        keep = [a for bunch in categorize([std(a, person) for a in data]).values() for a in bunch]
+        metrics.inc("news_entries_total", len(data), feed="mediastack", stage="parsed")
+        metrics.inc("news_entries_total", len(keep), feed="mediastack", stage="kept")
+        n, dup = save(keep, c)
+        ins += n
+        offset += len(data)
+        end = not data or (total is not None and offset >= total) or (refresh and dup and not n)
+        live = to >= TODAY                              # текущий месяц ещё пополняется
+        with c:
+            checkpoint(c, person, month, 0 if end and live else offset, end and not live)
+        print(f"{person} {month}: {offset}/{total if total is not None else '?'}")
+        if end: return ins
+
+# ─── 6. main ETL ────────────────────────────────────────────
 def main():
-    create()
-    rows = []
-    for person, query in PEOPLE.items():
-        for frm, to in month_range():
-            data = fetch(query, frm, to)
-            print(f"{person} {frm:%Y-%m}: {len(data)}")
-            rows.extend(std(a, person) for a in data)
-            time.sleep(1.1)       # 1 call/sec — безопасный запас
-    for bunch in categorize(rows).values():
-        save(bunch)
+    if not KEY:
+        sys.exit("❌ MEDIASTACK_KEY не найден (.env или env-var)")
+    conn = connect()
+    with conn: create(conn)
+    bucket = TokenBucket(RPS)
+    ins = 0
+    try:
+        for person, query in PEOPLE.items():
+            for frm, to in month_range():
+                ins += backfill(conn, bucket, person, query, frm, to)
+    except QuotaExceeded:
+        print(f"⚠️ Mediastack: квота {QUOTA} запросов на месяц исчерпана, продолжим позже")
+    finally:
+        conn.close()
+        metrics.write("mediastack")
+    print(f"Mediastack: вставлено {ins}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Метрики конвейера: счётчики, gauge, гистограммы и таймеры.
+
+▪ включаются env METRICS_DIR — туда пишутся <job>.prom (textfile для
+  node_exporter) и <job>.json (отчёт о прогоне)
+▪ без METRICS_DIR все вызовы — пустые функции: ни блокировок, ни словарей
+▪ имена — news_*; метки — ключевые аргументы: inc("news_rows_total", n, result="inserted")
+
+    with metrics.timer("news_stage_seconds", stage="save"): ...
+    metrics.write("rss")                  # в конце main()
+"""
+
+import contextlib, json, os, threading, time
+from datetime import datetime
+from pathlib import Path
+
+DIR = os.getenv("METRICS_DIR")
+ENABLED = bool(DIR)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+_lock = threading.Lock()
+_counters: dict[tuple, float] = {}
+_gauges:   dict[tuple, float] = {}
+_hists:    dict[tuple, list]  = {}        # [счётчики корзин…, сумма, число, min, max]
+_started = time.time()
+
+def _key(name: str, labels: dict) -> tuple:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+# ─── запись ────────────────────────────────────────────────
+def inc(name: str, value: float = 1, **labels) -> None:
+    if not ENABLED: return
+    k = _key(name, labels)
+    with _lock:
+        _counters[k] = _counters.get(k, 0) + value
+
+def gauge(name: str, value: float, **labels) -> None:
+    if not ENABLED: return
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+def observe(name: str, value: float, **labels) -> None:
+    if not ENABLED: return
+    k = _key(name, labels)
+    with _lock:
+        h = _hists.get(k)
+        if h is None:
+            h = _hists[k] = [0] * len(BUCKETS) + [0.0, 0, value, value]
+        for i, b in enumerate(BUCKETS):
+            if value <= b: h[i] += 1
+        n = len(BUCKETS)
+        h[n] += value; h[n + 1] += 1
+        h[n + 2] = min(h[n + 2], value); h[n + 3] = max(h[n + 3], value)
+
+class _Timer:
+    __slots__ = ("name", "labels", "t")
+
+    def __init__(self, name: str, labels: dict):
+        self.name, self.labels = name, labels
+
+    def __enter__(self):
+        self.t = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.t, **self.labels)
+
+_NOOP = contextlib.nullcontext()
+
+def timer(name: str, **labels):
+    """Контекстный менеджер: длительность блока → гистограмма name."""
+    return _Timer(name, labels) if ENABLED else _NOOP
+
+# ─── выгрузка ──────────────────────────────────────────────
+def _labels(*groups: tuple) -> str:
+    items = [kv for g in groups for kv in g]
+    if not items: return ""
+    esc = lambda v: v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in items) + "}"
+
+def prometheus(job: str) -> str:
+    """
+    Текст в формате Prometheus exposition (для textfile collector).
+    Метка job — у каждого ряда: файлы разных задач лежат в одной папке,
+    а node_exporter отвергает одинаковые ряды из разных .prom.
+    """
+    out, typed, j = [], set(), (("job", job),)
+    def head(name: str, kind: str) -> None:
+        if name not in typed:
+            typed.add(name); out.append(f"# TYPE {name} {kind}")
+    with _lock:
+        for (name, lb), v in sorted(_counters.items()):
+            head(name, "counter"); out.append(f"{name}{_labels(j, lb)} {v:g}")
+        for (name, lb), v in sorted(_gauges.items()):
+            head(name, "gauge"); out.append(f"{name}{_labels(j, lb)} {v:g}")
+        for (name, lb), h in sorted(_hists.items()):
+            head(name, "histogram")
+            n = len(BUCKETS)
+            for b, c in zip(BUCKETS, h):
+                out.append(f"{name}_bucket{_labels(j, lb, (('le', f'{b:g}'),))} {c}")
+            out.append(f"{name}_bucket{_labels(j, lb, (('le', '+Inf'),))} {h[n + 1]}")
+            out.append(f"{name}_sum{_labels(j, lb)} {h[n]:g}")
+            out.append(f"{name}_count{_labels(j, lb)} {h[n + 1]}")
+    out += ["# TYPE news_run_duration_seconds gauge",
+            f"news_run_duration_seconds{_labels(j)} {time.time() - _started:.3f}",
+            "# TYPE news_run_last_timestamp_seconds gauge",
+            f"news_run_last_timestamp_seconds{_labels(j)} {time.time():.0f}"]
+    return "\n".join(out) + "\n"
+
+def report(job: str) -> dict:
+    """Отчёт о прогоне: все метрики с метками, по гистограммам — count/sum/min/max/mean."""
+    n = len(BUCKETS)
+    row = lambda name, lb, **v: dict(name=name, labels=dict(lb), **v)
+    with _lock:
+        return dict(
+            job=job,
+            started=datetime.utcfromtimestamp(_started).isoformat(timespec="seconds"),
+            seconds=round(time.time() - _started, 3),
+            counters=[row(k, lb, value=v) for (k, lb), v in sorted(_counters.items())],
+            gauges=[row(k, lb, value=v) for (k, lb), v in sorted(_gauges.items())],
+            histograms=[row(k, lb, count=h[n + 1], sum=round(h[n], 6), min=h[n + 2],
+                            max=h[n + 3], mean=round(h[n] / h[n + 1], 6))
+                        for (k, lb), h in sorted(_hists.items())],
+        )
+
+def write(job: str) -> None:
+    """<METRICS_DIR>/<job>.prom и <job>.json; запись атомарная (tmp → rename)."""
+    if not ENABLED: return
+    d = Path(DIR)
+    d.mkdir(parents=True, exist_ok=True)
+    for name, text in ((f"{job}.prom", prometheus(job)),
+                       (f"{job}.json", json.dumps(report(job), ensure_ascii=False, indent=2))):
+        tmp = d / f".{name}.tmp"
+        tmp.write_text(text, encoding="utf-8")
+        os.replace(tmp, d / name)
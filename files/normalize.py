@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Чистка текста статей до записи в базу: HTML → обычный текст.
+
+▪ комментарии (в т.ч. условные <!--[if mso]>…), <script>, <style>, <noscript> — целиком
+▪ теги: блочные → пробел, строчные → ничего
+▪ HTML-сущности (&amp; &gt; &#8217; …) раскрываются; экранированная
+  разметка (&lt;p&gt;) после раскрытия снимается вторым проходом
+▪ остатки обработчиков onclick — «{ window.open(…); }, 200); return false;">»
+▪ хвост NewsAPI «… [+1039 chars]», пробелы и переводы строк схлопываются
+
+Исходный HTML при желании хранится рядом сжатым (articles.raw, zlib),
+KEEP_RAW=0 — не хранить.
+"""
+
+import html, os, re, zlib
+
+KEEP_RAW = os.getenv("KEEP_RAW", "1") == "1"
+
+_DROP  = re.compile(r"<!--.*?-->|<(script|style|noscript|head)\b[^>]*>.*?</\1\s*>",
+                    re.S | re.I)
+_BLOCK = re.compile(r"</?(?:p|br|div|li|ul|ol|h[1-6]|tr|td|th|table|blockquote|section|"
+                    r"article|figure|figcaption|header|footer|hr)\b[^>]*>", re.I)
+_TAG   = re.compile(r"</?[a-zA-Z][^>]*>|<![^>]*>")
+_JS    = re.compile(r"\{[^{}]*\}\s*(?:,\s*\d+\s*\)\s*;?)?\s*return\s+(?:false|true)\s*;?\s*\"?\s*>?")
+_CHARS = re.compile(r"\s*\[\+\d+ chars\]\s*$")
+
+def _strip(s: str) -> str:
+    s = _DROP.sub(" ", s)
+    s = _BLOCK.sub(" ", s)
+    return _TAG.sub("", s)
+
+def text(raw: str | None) -> str:
+    """Чистый текст из HTML-фрагмента ленты; обычный текст почти не трогается."""
+    if not raw: return ""
+    s = raw
+    if "<" in s: s = _strip(s)
+    if "&" in s:
+        s = html.unescape(s)
+        if "<" in s: s = _strip(s)
+    if "return" in s: s = _JS.sub(" ", s)
+    if "chars]" in s: s = _CHARS.sub("", s)
+    return " ".join(s.split())
+
+# ─── исходник ──────────────────────────────────────────────
+def changed(raw: str | None, clean: str) -> bool:
+    """Чистка убрала что-то кроме лишних пробелов."""
+    return bool(raw) and " ".join(raw.split()) != clean
+
+def pack(raw: str | None, clean: str) -> bytes | None:
+    """Сжатый исходник — только если KEEP_RAW и чистка действительно что-то убрала."""
+    if not KEEP_RAW or not changed(raw, clean): return None
+    return zlib.compress(raw.encode(), 6)
+
+def unpack(blob: bytes | None) -> str | None:
+    return zlib.decompress(blob).decode() if blob else None
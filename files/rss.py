@@ -2,45 +2,145 @@
 """
 Парсит RSS-ленты из rss_feeds.py, классифицирует по политикам
 и дописывает в базу news.db (путь DB_PATH).
+
+Ленты скачиваются параллельно (см. fetcher.py), feedparser получает уже
+готовые байты. Если лента не изменилась (304 или тот же хэш тела),
+парсинг, categorize() и save() для неё пропускаются; записи, уже виденные
+в прошлый раз, тоже не обрабатываются повторно.
+
+Конвейер потоковый: загрузка → разбор и очистка HTML (normalize.py) →
+классификация → запись микропакетами (RSS_BATCH статей или раз
+в RSS_FLUSH сек). Первые ленты
+попадают в news.db, пока остальные ещё качаются; в памяти — не больше
+окна fetch_all() и одного пакета, сколько бы лент ни было.
 """
 
+import os, time
 import feedparser
 from datetime import datetime
-from database import create, categorize, save
+import metrics
+from database import connect, categorize, politician, save, feed_states, save_feed_states
+from fetcher import body_hash, fetch_all, host
+from normalize import text
 from rss_feeds import RSS_FEEDS
 
 def iso(dt: datetime) -> str:
     return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
 
-def parse(url: str, src: str):
-    f = feedparser.parse(url)
-    rows = []
+def parse(url: str, src: str, body: bytes | None = None):
+    """body — уже скачанная лента; если None, feedparser качает url сам."""
+    with metrics.timer("news_stage_seconds", stage="parse"):
+        f = feedparser.parse(body if body is not None else url)
+    rows, no_date = [], 0
     for e in f.entries:
-        if not getattr(e, "published_parsed", None): continue
+        if not getattr(e, "published_parsed", None):
+            no_date += 1; continue
         dt = datetime(*e.published_parsed[:6])
+        raw = e.get("content", [{}])[0].get("value") or e.get("summary", "")
         rows.append(
             dict(
                 source=src,
-                title=e.get("title", "").strip(),
+                title=text(e.get("title", "")),
                 url=e.get("link", "").strip(),
                 publishedAt=iso(dt),
-                content=(e.get("content", [{}])[0].get("value")
-                         or e.get("summary", "")).strip(),
+                content=text(raw),
+                raw=raw,
             )
         )
+    metrics.inc("news_entries_total", len(f.entries), feed=src, stage="parsed")
+    metrics.inc("news_entries_total", no_date, feed=src, stage="no_date")
     return rows
 
-def main():
-    create()
-    raw = []
-    for name, url in RSS_FEEDS.items():
-        print("RSS:", name)
-        raw.extend(parse(url, name))
+def handle(name: str, r: dict, old: dict) -> tuple[dict | None, list[dict]]:
+    """
+    Разбор одного ответа fetcher.fetch().
+    Возвращает (новое состояние ленты, все её записи); состояние None —
+    304 или ошибка, записи [] — тело не изменилось с прошлого раза.
+    """
+    h = host(r["url"])
+    metrics.observe("news_feed_fetch_seconds", r["elapsed"], feed=name)
+    metrics.inc("news_http_responses_total", host=h, status=r["status"] or "error")
+    metrics.inc("news_http_bytes_total", len(r["body"]), host=h)
+    if r["status"] == 304:
+        metrics.inc("news_feed_polls_total", feed=name, result="not_modified")
+        print(f"RSS: {name} — не изменилась (304)"); return None, []
+    if r["error"] or r["status"] != 200:
+        metrics.inc("news_feed_polls_total", feed=name, result="error")
+        print(f"⚠️ RSS: {name} — {r['error'] or r['status']}"); return None, []
+    st = dict(etag=r["headers"].get("ETag"),
+              last_modified=r["headers"].get("Last-Modified"),
+              body_hash=body_hash(r["body"]),
+              seen_ids=old.get("seen_ids", set()))
+    if st["body_hash"] == old.get("body_hash"):
+        metrics.inc("news_feed_polls_total", feed=name, result="unchanged")
+        print(f"RSS: {name} — то же содержимое"); return st, []
+    metrics.inc("news_feed_polls_total", feed=name, result="changed")
+    rows = parse(r["url"], name, r["body"])
+    st["seen_ids"] = {a["url"] for a in rows}           # id записи = её ссылка
+    return st, rows
+
+def unseen(rows: list[dict], old: dict) -> list[dict]:
+    """Записи, которых не было в ленте при прошлом опросе."""
+    return [a for a in rows if a["url"] not in old.get("seen_ids", ())]
 
+def store(raw: list[dict], conn) -> tuple[int, int]:
+    """categorize() + save() одним пакетом. Возвращает (вставлено, дубликатов)."""
+    rows = []
     for pol, bunch in categorize(raw).items():
         for art in bunch:
             art["politician"] = pol
-        save(bunch)
+        rows.extend(bunch)
+    return save(rows, conn)
+
+# ─── потоковый конвейер ────────────────────────────────────
+BATCH = int(os.getenv("RSS_BATCH", 500))       # статей на одну запись в базу
+FLUSH = float(os.getenv("RSS_FLUSH", 2.0))     # но не реже, чем раз в FLUSH сек
+
+def entries(results, states: dict[str, dict]):
+    """(name, ответ) → (url, новое состояние, новые записи) для каждой ответившей ленты."""
+    for name, r in results:
+        old = states.get(r["url"], {})
+        st, rows = handle(name, r, old)
+        if st is None: continue
+        new = unseen(rows, old)
+        metrics.inc("news_entries_total", len(new), feed=name, stage="new")
+        if rows:
+            print(f"RSS: {name} ({r['elapsed']:.1f} s) — новых записей: {len(new)}")
+        yield r["url"], st, new
+
+def classify(items):
+    """Проставляет politician; статьи без известных имён отбрасываются."""
+    for url, st, rows in items:
+        keep = []
+        for a in rows:
+            a["politician"] = politician(a)
+            if a["politician"]: keep.append(a)
+        if rows:
+            metrics.inc("news_entries_total", len(keep), feed=rows[0]["source"], stage="kept")
+        yield url, st, keep
+
+def batches(items, size: int = BATCH, every: float = FLUSH):
+    """Микропакеты (статьи, состояния их лент): по size статей или раз в every сек."""
+    rows, sts, t = [], {}, time.monotonic()
+    for url, st, keep in items:
+        rows.extend(keep); sts[url] = st
+        if len(rows) >= size or time.monotonic() - t >= every:
+            yield rows, sts
+            rows, sts, t = [], {}, time.monotonic()
+    if rows or sts:
+        yield rows, sts
+
+def main():
+    conn = connect()
+    states = feed_states()
+    ins = dup = 0
+    for rows, sts in batches(classify(entries(fetch_all(RSS_FEEDS, states), states))):
+        i, d = save(rows, conn)
+        ins, dup = ins + i, dup + d
+        save_feed_states(sts)                   # состояние — только после записи статей
+    conn.close()
+    metrics.write("rss")
+    print(f"RSS: вставлено {ins}, дубликатов {dup}")
 
     print("✅ RSS-ленты сохранены")
 
@@ -1,22 +1,166 @@
-import time
+# -*- coding: utf-8 -*-
+"""
+Демон сбора RSS: каждая лента опрашивается в своём темпе.
+
+    python schedule_parsing.py [--duration 3600]
+
+▪ очередь с приоритетом (heapq) по времени следующего опроса
+▪ темп ленты — медианный интервал между её записями (сначала — по статьям
+  из news.db, затем по самой ленте); частые ленты (RIA, TASS, Reuters) —
+  раз в несколько минут, редкие — до SCHED_MAX
+▪ ±JITTER к каждому сроку, чтобы ленты не собирались в одну секунду
+▪ хост с ошибкой откладывается целиком: SCHED_MIN · 2^ошибок, до SCHED_MAX
+▪ не больше SCHED_WORKERS загрузок одновременно (и RSS_PER_HOST на хост)
+"""
+
+import argparse, heapq, os, random, sqlite3, statistics, time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
-from rss import fetch_rss_news
-from api_fetcher import update_news
+
+import dates, metrics
+from database import connect, feed_states, save_feed_states
+from fetcher import conditional, fetch, host
+from rss import handle, store, unseen
+from rss_feeds import RSS_FEEDS
+
+MIN_EVERY = float(os.getenv("SCHED_MIN", 300))          # 5 мин
+MAX_EVERY = float(os.getenv("SCHED_MAX", 6 * 3600))     # 6 ч
+WORKERS   = int(os.getenv("SCHED_WORKERS", 4))
+JITTER    = 0.1
+HISTORY   = 20            # последних записей для оценки темпа
 
 def log(msg):
     print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {msg}")
 
-def run_daily():
-    while True:
-        log("Запуск сбора новостей")
-        try:
-            fetch_rss_news()
-            update_news()
-            log("Завершено, спим 24 ч.")
-        except Exception as e:
-            log("Ошибка: " + str(e))
-        time.sleep(86400)
+# ─── темп ленты ────────────────────────────────────────────
+def cadence(times: list[float]) -> float | None:
+    """Медианный интервал (сек) между последними HISTORY записями; None — мало данных."""
+    ts = sorted(times, reverse=True)[:HISTORY]
+    gaps = [a - b for a, b in zip(ts, ts[1:]) if a > b]
+    return statistics.median(gaps) if gaps else None
 
-if __name__ == "__main__":
-    run_daily()
+def clamp(sec: float) -> float:
+    return min(MAX_EVERY, max(MIN_EVERY, sec))
+
+def jitter(sec: float) -> float:
+    return sec * (1 + random.uniform(-JITTER, JITTER))
+
+def seed(c: sqlite3.Connection, name: str) -> float:
+    """Начальный интервал по уже сохранённым статьям источника (индекс articles_source_ts)."""
+    ts = [t for (t,) in c.execute(
+        """SELECT a.published_ts FROM articles a JOIN sources s ON s.id = a.source_id
+           WHERE s.name = ? ORDER BY a.published_ts DESC LIMIT ?""",
+        (name, HISTORY),
+    )]
+    gap = cadence(ts)
+    return clamp(gap) if gap else MIN_EVERY
 
+def entry_times(rows: list[dict]) -> list[float]:
+    return [t for a in rows if (t := dates.parse(a["publishedAt"])) is not None]
+
+# ─── планировщик ───────────────────────────────────────────
+class Scheduler:
+    def __init__(self, feeds: dict[str, str], workers: int = WORKERS):
+        self.feeds   = feeds
+        self.workers = workers
+        self.conn    = connect()
+        self.states  = feed_states()
+        self.every   = {n: seed(self.conn, n) for n in feeds}
+        self.fails:   dict[str, int]   = {}                 # хост → ошибок подряд
+        self.errors:  dict[str, int]   = {}                 # лента → исключений подряд
+        self.blocked: dict[str, float] = {}                 # хост → до какого момента
+        now = time.time()
+        # первый обход растянут на минимальный интервал, а не залпом
+        self.queue = [(now + random.uniform(0, MIN_EVERY), n) for n in feeds]
+        heapq.heapify(self.queue)
+        self.polls = 0
+
+    def plan(self, name: str, delay: float) -> None:
+        heapq.heappush(self.queue, (time.time() + jitter(delay), name))
+
+    def done(self, name: str, r: dict) -> None:
+        """Обработать ответ ленты и поставить её в очередь заново."""
+        url, h = self.feeds[name], host(self.feeds[name])
+        self.polls += 1
+        old = self.states.get(url, {})
+        st, rows = handle(name, r, old)
+        if st is None and r["status"] != 304:               # ошибка хоста
+            n = self.fails[h] = self.fails.get(h, 0) + 1
+            back = clamp(MIN_EVERY * 2 ** n)
+            self.blocked[h] = time.time() + back
+            log(f"{name}: ошибка №{n}, хост {h} отложен на {back / 60:.0f} мин")
+            self.plan(name, back)
+            return
+        self.fails.pop(h, None); self.blocked.pop(h, None)
+        if rows:
+            new = unseen(rows, old)
+            gap = cadence(entry_times(rows))
+            if gap: self.every[name] = clamp((self.every[name] + gap) / 2)
+            if new:
+                ins, dup = store(new, self.conn)
+                log(f"{name}: новых записей {len(new)}, вставлено {ins}")
+        else:                                               # ничего нового — реже
+            self.every[name] = clamp(self.every[name] * 1.5)
+        if st is not None:                                  # только после записи статей
+            self.states[url] = st
+            save_feed_states({url: st})
+        self.errors.pop(name, None)
+        metrics.gauge("news_feed_interval_seconds", self.every[name], feed=name)
+        metrics.write("scheduler")
+        self.plan(name, self.every[name])
+
+    def failed(self, name: str, e: Exception) -> None:
+        """Исключение при разборе или записи (например, database is locked):
+        лента откладывается SCHED_MIN · 2^исключений, демон работает дальше."""
+        n = self.errors[name] = self.errors.get(name, 0) + 1
+        back = clamp(MIN_EVERY * 2 ** n)
+        metrics.inc("news_feed_polls_total", feed=name, result="exception")
+        log(f"{name}: {type(e).__name__}: {e} — повтор через {back / 60:.0f} мин")
+        self.plan(name, back)
+
+    def run(self, duration: float | None = None) -> None:
+        stop = time.time() + duration if duration else float("inf")
+        running = {}
+        with ThreadPoolExecutor(self.workers) as pool:
+            while time.time() < stop or running:
+                now = time.time()
+                while (self.queue and self.queue[0][0] <= now
+                       and len(running) < self.workers and now < stop):
+                    _, name = heapq.heappop(self.queue)
+                    url = self.feeds[name]
+                    until = self.blocked.get(host(url), 0)
+                    if until > now:                         # хост ещё на паузе
+                        heapq.heappush(self.queue, (until + jitter(1), name)); continue
+                    fut = pool.submit(fetch, url, conditional(self.states.get(url)))
+                    running[fut] = name
+                # все потоки заняты — ждать завершения опроса, а не головы очереди
+                # (она может быть уже «просрочена» → timeout 0 и холостой цикл)
+                nxt = self.queue[0][0] if self.queue and len(running) < self.workers else stop
+                timeout = max(0.0, min(nxt, stop) - time.time()) if now < stop else None
+                if timeout == float("inf"): timeout = None
+                if not running:
+                    time.sleep(60 if timeout is None else min(timeout, 60)); continue
+                finished, _ = wait(running, timeout=timeout, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    name = running.pop(fut)
+                    try:
+                        self.done(name, fut.result())
+                    except Exception as e:
+                        self.failed(name, e)
+        self.conn.close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Адаптивный опрос RSS-лент")
+    ap.add_argument("--duration", type=float, help="остановиться через N секунд")
+    a = ap.parse_args()
+    s = Scheduler(RSS_FEEDS)
+    log(f"лент {len(RSS_FEEDS)}, интервалы {MIN_EVERY / 60:.0f}–{MAX_EVERY / 60:.0f} мин, "
+        f"одновременно {s.workers}")
+    try:
+        s.run(a.duration)
+    except KeyboardInterrupt:
+        pass
+    log(f"остановлен, опросов: {s.polls}")
+
+if __name__ == "__main__":
+    main()
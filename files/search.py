@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Поиск по архиву через FTS5-индекс news_fts (см. database.create_fts).
+
+    python search.py '"trade war" AND (Xi OR Trump)' --from 2025-01-01 --politician Xi
+    python search.py 'sanctions NOT oil' --sentiment negative --limit 5
+
+▪ синтаксис запроса — FTS5: "фраза", AND / OR / NOT, префикс tariff*
+▪ ранжирование BM25 (заголовок весит вдвое больше текста), сниппеты
+"""
+
+import argparse, sqlite3, time
+
+from database import DB, create
+
+def search(c: sqlite3.Connection, query: str, frm: str | None = None, to: str | None = None,
+           politician: str | None = None, sentiment: str | None = None,
+           limit: int = 20) -> list[dict]:
+    """Статьи по FTS5-запросу с фильтрами, лучшие по BM25 — первыми."""
+    where, args = ["news_fts MATCH ?"], [query]
+    if frm:        where.append("a.published_ts >= CAST(strftime('%s', ?) AS INTEGER)"); args.append(frm)
+    if to:         where.append("a.published_ts < CAST(strftime('%s', ?, '+1 day') AS INTEGER)"); args.append(to)
+    if politician: where.append("e.name = ?");      args.append(politician)
+    if sentiment:  where.append("a.sentiment = ?"); args.append(sentiment)
+    rows = c.execute(
+        f"""SELECT a.id, datetime(a.published_ts, 'unixepoch') AS published_at,
+                   s.name AS source, e.name AS politician, a.sentiment, a.title, a.url,
+                   snippet(news_fts, 1, '[', ']', '…', 16) AS snippet,
+                   bm25(news_fts, 2.0, 1.0) AS rank
+            FROM news_fts JOIN articles a ON a.id = news_fts.rowid
+            LEFT JOIN sources  s ON s.id = a.source_id
+            LEFT JOIN entities e ON e.id = a.entity_id
+            WHERE {" AND ".join(where)}
+            ORDER BY rank LIMIT ?""",
+        (*args, limit),
+    )
+    cols = [d[0] for d in rows.description]
+    return [dict(zip(cols, r)) for r in rows]
+
+def main():
+    ap = argparse.ArgumentParser(description="Полнотекстовый поиск по news.db")
+    ap.add_argument("query", help='FTS5-запрос: слова, "фразы", AND / OR / NOT')
+    ap.add_argument("--from", dest="frm", help="с даты YYYY-MM-DD")
+    ap.add_argument("--to", help="по дату YYYY-MM-DD включительно")
+    ap.add_argument("--politician")
+    ap.add_argument("--sentiment", choices=["positive", "neutral", "negative"])
+    ap.add_argument("--limit", type=int, default=20)
+    a = ap.parse_args()
+
+    create()
+    with sqlite3.connect(DB) as c:
+        t = time.perf_counter()
+        try:
+            hits = search(c, a.query, a.frm, a.to, a.politician, a.sentiment, a.limit)
+        except sqlite3.OperationalError as e:
+            if "fts5" not in str(e) and "no such column" not in str(e): raise
+            ap.error(f"не разобран FTS5-запрос ({e}). Слова с дефисом или апострофом "
+                     f'и фразы берите в двойные кавычки внутри запроса: "Xi Jin-ping", "Trump\'s"')
+        dt = time.perf_counter() - t
+    for h in hits:
+        print(f"{h['published_at']}  {h['source']:<22.22} {h['politician']:<6} "
+              f"{h['sentiment'] or '—':<8} {h['title']}")
+        print(f"    {h['snippet']}")
+        print(f"    {h['url']}")
+    print(f"— найдено {len(hits)} за {dt * 1e3:.1f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,175 @@
 # -*- coding: utf-8 -*-
 """
 Добавляет колонку sentiment в news.db с помощью NLTK-VADER.
+
+▪ неоценённые строки читаются порциями по id (keyset), без fetchall()
+▪ порции оцениваются в пуле процессов, в каждом свой экземпляр VADER
+▪ коммит после каждой порции — после сбоя запуск продолжается с места остановки
+▪ сохраняются compound/pos/neu/neg; смена порогов — один UPDATE (--relabel)
+▪ текст с уже оценённым text_hash или из уже оценённого кластера перепечаток
+  (dedup.py) не оценивается заново — оценка копируется; в том числе если
+  ключ ещё оценивается в другой порции: копия — после её результата
 """
 
-import sqlite3, os, nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
+import argparse, os, time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import nltk
 from tqdm import tqdm
-from pathlib import Path
-from database import create
+import aggregates, metrics
+from database import connect, text_hash
 
-DB = Path(os.getenv("DB_PATH", Path(__file__).parent / "news.db"))
-create()
+CHUNK   = int(os.getenv("SENT_CHUNK", 2000))                 # строк на порцию
+WORKERS = int(os.getenv("SENT_WORKERS", os.cpu_count() or 1))
+POS = float(os.getenv("SENT_POS", 0.2))                       # пороги compound
+NEG = float(os.getenv("SENT_NEG", -0.2))
 
-nltk.download("vader_lexicon", quiet=True)
-vader = SentimentIntensityAnalyzer()
+# ─── воркер ────────────────────────────────────────────────
+_vader = None
 
-def main():
-    with sqlite3.connect(DB) as c:
+def _init() -> None:
+    """Инициализатор процесса: один VADER на воркер."""
+    global _vader
+    from nltk.sentiment import SentimentIntensityAnalyzer
+    _vader = SentimentIntensityAnalyzer()
+
+def label(sc: float) -> str:
+    return "positive" if sc > POS else "negative" if sc < NEG else "neutral"
+
+def score(rows: list[tuple]) -> dict:
+    """[(ключ, title, content)] → {ключ: (compound, pos, neu, neg)}"""
+    out = {}
+    for key, title, cont in rows:
+        sc = _vader.polarity_scores((title or "") + " " + (cont or ""))
+        out[key] = (sc["compound"], sc["pos"], sc["neu"], sc["neg"])
+    return out
+
+# ─── чтение порциями ───────────────────────────────────────
+def chunks(c, size: int = CHUNK):
+    """Keyset-пагинация: WHERE id > последний id, без OFFSET и без fetchall всей таблицы."""
+    last = 0
+    while True:
         rows = c.execute(
-            "SELECT id,title,content FROM news WHERE sentiment IS NULL"
+            """SELECT id, title, content, text_hash, cluster_id FROM articles
+               WHERE compound IS NULL AND id > ? ORDER BY id LIMIT ?""",
+            (last, size),
         ).fetchall()
-        if not rows:
-            print("✓ sentiment: nothing to do"); return
-
-        upd = []
-        for _id, title, cont in tqdm(rows, desc="sentiment"):
-            txt = (title or "") + " " + (cont or "")
-            sc = vader.polarity_scores(txt)["compound"]
-            sent = "positive" if sc > 0.2 else "negative" if sc < -0.2 else "neutral"
-            upd.append((sent, _id))
-        c.executemany("UPDATE news SET sentiment=? WHERE id=?", upd)
-        c.commit()
-    print("✓ sentiment обновлён:", len(upd))
+        if not rows: return
+        yield rows
+        last = rows[-1][0]
+
+def key(h: str | None, cluster: int | None, title: str, cont: str):
+    """Ключ «одна оценка на всех»: кластер перепечаток, иначе хэш текста."""
+    return cluster if cluster is not None else h or text_hash(title, cont)
+
+def known(c, keys: set) -> dict:
+    """Оценки, уже посчитанные для этих кластеров / text_hash."""
+    out = {}
+    for col, vals in (("cluster_id", [k for k in keys if isinstance(k, int)]),
+                      ("text_hash",  [k for k in keys if isinstance(k, str)])):
+        if not vals: continue
+        q = ",".join("?" * len(vals))
+        out.update({
+            k: sc for k, *sc in c.execute(
+                f"""SELECT {col}, compound, pos, neu, neg FROM articles
+                    WHERE compound IS NOT NULL AND {col} IN ({q})
+                    GROUP BY {col}""",
+                vals,
+            )
+        })
+    return out
+
+# ─── пороги ────────────────────────────────────────────────
+def relabel(c, pos: float = POS, neg: float = NEG) -> int:
+    """
+    Пересчитать метки по сохранённому compound — без повторной оценки.
+    Агрегаты пересобираются, Parquet-партиции будут переписаны при следующей выгрузке.
+    """
+    import export                               # pyarrow — только когда нужен
+    with c:
+        n = c.execute(
+            """UPDATE articles SET sentiment = CASE
+                   WHEN compound > ? THEN 'positive'
+                   WHEN compound < ? THEN 'negative'
+                   ELSE 'neutral' END
+               WHERE compound IS NOT NULL""",
+            (pos, neg),
+        ).rowcount
+        aggregates.rebuild(c)
+        export.reset(c)
+    return n
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    ap.add_argument("--relabel", action="store_true",
+                    help="только пересчитать метки по --pos / --neg")
+    ap.add_argument("--pos", type=float, default=POS)
+    ap.add_argument("--neg", type=float, default=NEG)
+    args = ap.parse_args()
+
+    c = connect()
+    if args.relabel:
+        print("✓ sentiment: метки пересчитаны:", relabel(c, args.pos, args.neg))
+        c.close(); return
+
+    nltk.download("vader_lexicon", quiet=True)
+    total = c.execute("SELECT count(*) FROM articles WHERE compound IS NULL").fetchone()[0]
+    if not total:
+        print("✓ sentiment: nothing to do"); c.close(); return
+
+    def commit(ids: dict, scores: dict, how: str = "scored") -> int:
+        upd = [(label(sc[0]), *sc, i) for k, sc in scores.items() for i in ids[k]]
+        metrics.inc("news_sentiment_rows_total", len(upd), how=how)
+        with metrics.timer("news_stage_seconds", stage="sentiment_commit"), c:
+            aggregates.retract(c, [u[-1] for u in upd])
+            c.executemany(
+                """UPDATE articles SET sentiment=?, compound=?, pos=?, neu=?, neg=?
+                   WHERE id=?""",
+                upd,
+            )
+            aggregates.reapply(c)
+        bar.update(len(upd))
+        return len(upd)
+
+    def drain() -> int:
+        """Записать самую старую порцию и копии ключей, которые ждали чужую порцию."""
+        ids, fut, later = pending.popleft()
+        got = fut.result()
+        m = commit(ids, got)
+        if later:
+            m += commit(ids, {k: f.result()[k] for k, f in later.items()}, "copied")
+        for k in got: inflight.pop(k, None)    # теперь их найдёт known()
+        return m
+
+    # inflight: ключ → future порции, где он оценивается (ещё не записан в базу)
+    n, pending, inflight, t0 = 0, deque(), {}, time.perf_counter()
+    with ProcessPoolExecutor(WORKERS, initializer=_init) as pool, \
+         tqdm(total=total, desc="sentiment") as bar:
+        for rows in chunks(c):
+            ids, todo = {}, []
+            for _id, title, cont, h, cl in rows:
+                k = key(h, cl, title, cont)
+                if k not in ids: todo.append((k, title, cont))
+                ids.setdefault(k, []).append(_id)
+            later = {k: inflight[k] for k in ids if k in inflight}
+            done = known(c, {k for k in ids if k not in later})
+            if done:
+                n += commit(ids, done, "copied")
+            todo = [r for r in todo if r[0] not in done and r[0] not in later]
+            fut = pool.submit(score, todo)
+            inflight.update((r[0], fut) for r in todo)
+            pending.append((ids, fut, later))
+            if len(pending) >= 2 * WORKERS:          # не читаем далеко вперёд
+                n += drain()
+        while pending:
+            n += drain()
+    c.close()
+    dt = time.perf_counter() - t0
+    metrics.observe("news_stage_seconds", dt, stage="sentiment")
+    metrics.gauge("news_sentiment_rows_per_second", n / dt if dt else 0)
+    metrics.write("sentiment")
+    print("✓ sentiment обновлён:", n)
 
 if __name__ == "__main__":
     main()
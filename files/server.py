@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+Локальный HTTP-сервис только для чтения: те же ряды, что рисует analyze.py,
+в JSON (и PNG по запросу) — дашбордам не нужно ждать перерисовки graphs/.
+
+    python server.py [--host 127.0.0.1] [--port 8765]
+
+    GET /                              список графиков, рядов и параметров
+    GET /series/<имя>?from=…&to=…      таблица ряда (daily, hourly …) или
+                                       входная таблица графика (timeline_mentions …)
+    GET /chart/<график>.png?…          график analyze.py, отрисованный по запросу
+
+▪ параметры: from / to (YYYY-MM-DD, по умолчанию analyze.START … сегодня),
+  politician и source (через запятую или повтором), unique=1 — истории,
+  а не статьи (как UNIQUE_STORIES)
+▪ без source — из агрегатов (aggregates.py); с source или с границами
+  не по месяцам для помесячных агрегатов — прямо из articles
+▪ ответы в LRU-кэше (API_CACHE записей) по запросу; кэш сбрасывается, когда
+  меняется max(id) в articles или база меняется на месте (PRAGMA data_version —
+  например, оценка тональности); ETag + If-None-Match → 304 без расчёта
+▪ соединение read-only; запросы выполняются по одному (pandas, matplotlib)
+"""
+
+import argparse, calendar, hashlib, json, os, sqlite3, tempfile, threading, time, traceback
+from collections import OrderedDict
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import matplotlib.pyplot as plt
+import pandas as pd
+
+import aggregates, analyze, database, metrics
+
+HOST  = os.getenv("API_HOST", "127.0.0.1")
+PORT  = int(os.getenv("API_PORT", 8765))
+CACHE = int(os.getenv("API_CACHE", 256))        # ответов в памяти
+TABLES = 32                                     # наборов сводных таблиц (по фильтрам)
+BOOT  = int(time.time())                        # в ETag: после перезапуска — новые
+
+# график → имя его входной таблицы из analyze.prepare()
+CHARTS = {fn.__name__: fn.__code__.co_varnames[0] for fn in analyze.CHARTS}
+SERIES = sorted(set(CHARTS.values()))
+
+class Empty(Exception):
+    """По фильтрам нет ни одной строки — 404, а не пустая картинка."""
+
+class LRU:
+    def __init__(self, size: int):
+        self.size, self.d = size, OrderedDict()
+
+    def get(self, k):
+        v = self.d.get(k)
+        if v is not None: self.d.move_to_end(k)
+        return v
+
+    def put(self, k, v) -> None:
+        self.d[k] = v
+        self.d.move_to_end(k)
+        while len(self.d) > self.size: self.d.popitem(last=False)
+
+    def clear(self) -> None:
+        self.d.clear()
+
+# ─── параметры ─────────────────────────────────────────────
+def _list(q: dict, name: str) -> tuple[str, ...]:
+    return tuple(sorted({x.strip() for v in q.get(name, ()) for x in v.split(",") if x.strip()}))
+
+def filters(query: str) -> tuple:
+    """Строка запроса → нормализованный ключ (from, to, politicians, sources, unique)."""
+    q = parse_qs(query)
+    frm = date.fromisoformat(q["from"][0]) if "from" in q else analyze.START.date()
+    to  = date.fromisoformat(q["to"][0]) if "to" in q else date.today()
+    if frm > to: raise ValueError("from позже to")
+    return frm, to, _list(q, "politician"), _list(q, "source"), q.get("unique", ["0"])[0] == "1"
+
+# ─── загрузка ──────────────────────────────────────────────
+# кадр analyze.load() → (агрегат, колонка периода, колонки кадра)
+FRAMES = {
+    "day": ("agg_day",    "day",   ["day", "politician", "sentiment"]),
+    "src": ("agg_source", "month", ["source", "politician", "sentiment"]),
+    "hrs": ("agg_hour",   "month", ["weekday", "hour", "politician"]),
+}
+
+def _in(col: str, values: tuple) -> tuple[str, list]:
+    return (f" AND {col} IN ({','.join('?' * len(values))})", [*values]) if values else ("", [])
+
+def from_aggregates(c, table: str, period: str, cols: list[str], f: tuple) -> pd.DataFrame:
+    frm, to, pols, _, unique = f
+    lo, hi = frm.isoformat(), to.isoformat()
+    if period == "month": lo, hi = lo[:7], hi[:7]
+    cond, args = _in("politician", pols)
+    return pd.read_sql(f"SELECT {', '.join(cols)}, {'u' if unique else 'n'} AS n FROM {table} "
+                       f"WHERE {period} >= ? AND {period} <= ?{cond}", c, params=(lo, hi, *args))
+
+def from_articles(c, table: str, cols: list[str], f: tuple) -> pd.DataFrame:
+    """То же, что строка агрегата, но с фильтром по источнику и точными границами."""
+    frm, to, pols, srcs, unique = f
+    t = aggregates.TABLES[table]
+    keys = [k.strip() for k in t["key"].split(",")]
+    n = "sum(coalesce(a.cluster_id, a.id) = a.id)" if unique else "count(*)"
+    c1, a1 = _in("e.name", pols)
+    c2, a2 = _in("s.name", srcs)
+    lo = calendar.timegm(frm.timetuple())
+    hi = calendar.timegm((to + timedelta(days=1)).timetuple())
+    df = pd.read_sql(f"""SELECT {t['expr']}, {n} FROM {aggregates.FROM}
+                         WHERE a.published_ts >= ? AND a.published_ts < ?{c1}{c2}
+                         GROUP BY {', '.join(str(i + 1) for i in range(len(keys)))}""",
+                     c, params=(lo, hi, *a1, *a2))
+    df.columns = keys + ["n"]
+    return df[cols + ["n"]]
+
+def load(c: sqlite3.Connection, f: tuple) -> dict[str, pd.DataFrame]:
+    frm, to, _, srcs, _ = f
+    whole = frm.day == 1 and (to >= date.today() or (to + timedelta(days=1)).day == 1)
+    out = {}
+    for key, (table, period, cols) in FRAMES.items():
+        exact = not srcs and (period == "day" or whole)
+        out[key] = from_aggregates(c, table, period, cols, f) if exact else \
+                   from_articles(c, table, cols, f)
+    out["day"]["day"] = pd.to_datetime(out["day"]["day"])
+    return out
+
+def only(obj, pols: tuple):
+    """Убрать из таблицы политиков, которых не просили (колонки и строки из analyze.POL)."""
+    if not pols or not isinstance(obj, pd.DataFrame): return obj
+    drop = [p for p in analyze.POL if p not in pols]
+    return obj.drop(index=drop, columns=drop, errors="ignore")
+
+def table(obj) -> dict:
+    """DataFrame / Series → {index, columns, data}; NaN → null."""
+    df = obj.unstack(fill_value=0) if isinstance(obj, pd.Series) else obj.copy()
+    df.index, df.columns = df.index.map(str), df.columns.map(str)
+    return json.loads(df.to_json(orient="split"))
+
+# ─── состояние сервиса ─────────────────────────────────────
+class Store:
+    def __init__(self, path: Path):
+        self.c = sqlite3.connect(f"file:{path.as_posix()}?mode=ro", uri=True,
+                                 check_same_thread=False)
+        self.lock = threading.Lock()
+        self.version = None
+        self.responses, self.tables = LRU(CACHE), LRU(TABLES)
+        self.written = 0.0
+
+    def check(self) -> tuple[int, int]:
+        """Версия базы: (max(id), data_version); при смене — весь кэш долой."""
+        v = (self.c.execute("SELECT coalesce(max(id), 0) FROM articles").fetchone()[0],
+             self.c.execute("PRAGMA data_version").fetchone()[0])
+        if v != self.version:
+            self.version = v
+            self.responses.clear(); self.tables.clear()
+        return v
+
+    def etag(self, key: tuple) -> str:
+        h = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+        return f'"{BOOT:x}-{self.version[0]}-{self.version[1]}-{h}"'
+
+    def prepared(self, f: tuple):
+        cache = self.tables.get(f)
+        if cache is None:
+            with metrics.timer("news_api_seconds", step="load"):
+                frames = load(self.c, f)
+            with metrics.timer("news_api_seconds", step="prepare"):
+                cache = analyze.prepare(frames, end=pd.Timestamp(f[1]))[0]
+            cache = {k: only(v, f[2]) for k, v in cache.items()}
+            self.tables.put(f, cache)
+        return cache
+
+    def series(self, name: str, f: tuple) -> bytes:
+        step = CHARTS.get(name, name)
+        body = dict(series=step, chart=name if name in CHARTS else None,
+                    version=self.version[0], **table(self.prepared(f)[step]),
+                    filters={"from": f[0].isoformat(), "to": f[1].isoformat(),
+                             "politician": [*f[2]], "source": [*f[3]], "unique": f[4]})
+        return json.dumps(body, ensure_ascii=False).encode()
+
+    def png(self, name: str, f: tuple) -> bytes:
+        """График analyze.py во временную папку; у pie_sentiments — первый политик."""
+        data = self.prepared(f)[CHARTS[name]]
+        if data.empty or not data.fillna(0).to_numpy().any(): raise Empty("нет данных для графика")
+        fn = getattr(analyze, name)
+        gr = analyze.GR
+        with tempfile.TemporaryDirectory() as d, \
+             metrics.timer("news_api_seconds", step="render"):
+            analyze.GR = Path(d)
+            try:
+                fn(data)
+            finally:
+                analyze.GR = gr
+                plt.close("all")                # упавший график не копит фигуры
+            files = [Path(d) / f"pie_sentiment_{p}.png" for p in f[2]]
+            files = [p for p in files if p.exists()] or sorted(Path(d).glob("*.png"))
+            if not files: raise Empty("нет данных для графика")
+            return files[0].read_bytes()
+
+    def flush_metrics(self) -> None:
+        if time.time() - self.written > 15:
+            self.written = time.time()
+            metrics.write("api")
+
+STORE: Store | None = None
+
+# ─── HTTP ──────────────────────────────────────────────────
+class Handler(BaseHTTPRequestHandler):
+    server_version = "news-api/1"
+
+    def do_GET(self):
+        u = urlsplit(self.path)
+        parts = [p for p in u.path.split("/") if p]
+        if not parts:
+            with STORE.lock:
+                v = STORE.check()
+            return self.reply(200, dict(charts=CHARTS, series=SERIES, max_id=v[0],
+                                        params=["from", "to", "politician", "source", "unique"]),
+                              route="index")
+        if len(parts) == 2 and parts[0] == "series" and parts[1] in CHARTS.keys() | set(SERIES):
+            kind, name, ctype = "series", parts[1], "application/json"
+        elif len(parts) == 2 and parts[0] == "chart" and parts[1].removesuffix(".png") in CHARTS:
+            kind, name, ctype = "chart", parts[1].removesuffix(".png"), "image/png"
+        else:
+            return self.reply(404, dict(error="неизвестный путь", see="/"), route="unknown")
+        try:
+            f = filters(u.query)
+        except ValueError as e:
+            return self.reply(400, dict(error=str(e)), route=kind)
+
+        with STORE.lock:
+            STORE.check()
+            key = (kind, name, f)
+            etag = STORE.etag(key)
+            tags = {t.strip() for t in self.headers.get("If-None-Match", "").split(",")}
+            if etag in tags or "*" in tags:
+                metrics.inc("news_api_cache_total", result="not_modified")
+                return self.reply(304, None, route=kind, etag=etag)
+            body = STORE.responses.get(key)
+            metrics.inc("news_api_cache_total", result="hit" if body else "miss")
+            if body is None:
+                try:
+                    body = STORE.series(name, f) if kind == "series" else STORE.png(name, f)
+                except Empty as e:
+                    return self.reply(404, dict(error=str(e)), route=kind)
+                except Exception as e:
+                    traceback.print_exc()
+                    return self.reply(500, dict(error=f"{type(e).__name__}: {e}"), route=kind)
+                STORE.responses.put(key, body)
+            STORE.flush_metrics()
+        self.reply(200, body, route=kind, etag=etag, ctype=ctype)
+
+    def reply(self, code: int, body, route: str, etag: str | None = None,
+              ctype: str = "application/json") -> None:
+        if isinstance(body, dict): body = json.dumps(body, ensure_ascii=False).encode()
+        metrics.inc("news_api_requests_total", route=route, status=code)
+        self.send_response(code)
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")     # всегда сверяться по ETag
+        if body is not None:
+            self.send_header("Content-Type", f"{ctype}; charset=utf-8"
+                             if ctype == "application/json" else ctype)
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if body is not None: self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        print(f"[{self.log_date_time_string()}] {fmt % args}")
+
+def main():
+    global STORE
+    ap = argparse.ArgumentParser(description="HTTP API рядов analyze.py (только чтение)")
+    ap.add_argument("--host", default=HOST)
+    ap.add_argument("--port", type=int, default=PORT)
+    a = ap.parse_args()
+    if not database.DB.exists():
+        raise FileNotFoundError(f"news.db не найден по пути {database.DB}")
+    database.create()                           # миграции — один раз, до read-only
+    STORE = Store(database.DB)
+    srv = ThreadingHTTPServer((a.host, a.port), Handler)
+    print(f"✓ http://{a.host}:{srv.server_port}/  ({database.DB})")
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        metrics.write("api")
+
+if __name__ == "__main__":
+    main()
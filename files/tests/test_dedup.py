@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+dedup.signatures(): тексты без слов в пакете.
+
+    cd files && python -m pytest -q tests
+"""
+
+import numpy as np
+
+import dedup
+
+def test_empty_texts():
+    sigs = dedup.signatures([("", ""), ("", None)])
+    assert sigs.shape == (2, dedup.NUM_PERM)
+    assert (sigs[0] == sigs[1]).all()
+
+def test_empty_last_in_batch():
+    sigs = dedup.signatures([("a b c d e f", ""), ("", "")])
+    assert (sigs[1] == dedup.signatures([("", None)])[0]).all()
+
+def test_empty_does_not_depend_on_neighbour():
+    alone = dedup.signatures([(None, None)])[0]
+    for before, after in ((("x y", ""), ("q r s t u v", "")),
+                          (("a b c d e f", ""), ("z", "")),
+                          (("", "1 2 3"), ("", ""))):
+        sigs = dedup.signatures([before, ("", ""), after])
+        assert (sigs[1] == alone).all()
+        assert (sigs[0] == dedup.signatures([before])[0]).all()
+        assert (sigs[2] == dedup.signatures([after])[0]).all()
+
+def test_batch_matches_single():
+    rnd = np.random.default_rng(0)
+    vocab = "trump putin xi said on monday tariffs china talks".split()
+    rows = [(" ".join(rnd.choice(vocab, rnd.integers(0, 4))),
+             " ".join(rnd.choice(vocab, rnd.integers(0, 40)))) for _ in range(50)]
+    sigs = dedup.signatures(rows)
+    for row, sig in zip(rows, sigs):
+        assert (dedup.signatures([row])[0] == sig).all()